@@ -22,13 +22,28 @@ from typing import TYPE_CHECKING
 # pypi library
 from poetry.plugins.application_plugin import ApplicationPlugin
 
-# poetry-import library
-from poetry_import.command import ImportReqCommand
-
 if TYPE_CHECKING:
     # pypi library
     from poetry.console.application import Application
 
+    # poetry-import library
+    from poetry_import.command import ImportReqCommand
+
+
+def load_import_command() -> "ImportReqCommand":
+    """Build the `import` command, importing its module on first use.
+
+    Poetry activates application plugins on every invocation, so the command module (and with it
+    tomlkit and the requirements parser) is only imported once `poetry import` is actually run.
+
+    Returns:
+        ImportReqCommand: A fresh instance of the command.
+    """
+    # poetry-import library
+    from poetry_import.command import ImportReqCommand
+
+    return ImportReqCommand()
+
 
 class ImportReqPlugin(ApplicationPlugin):
     name = "import"
@@ -36,7 +51,10 @@ class ImportReqPlugin(ApplicationPlugin):
 
     @property
     def commands(self):
+        # poetry-import library
+        from poetry_import.command import ImportReqCommand
+
         return [ImportReqCommand]
 
     def activate(self, application: "Application") -> None:
-        application.command_loader.register_factory("import", ImportReqCommand)
+        application.command_loader.register_factory("import", load_import_command)
@@ -17,12 +17,19 @@ limitations under the License.
 from __future__ import annotations
 
 # standard library
+import atexit
 import importlib.util
+import inspect
+import os
+import re
 import sys
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
-from tempfile import mktemp
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, NamedTuple, Optional
 
 try:
     # pypi library
@@ -33,11 +40,40 @@ except ImportError:
     from cleo.exceptions import CleoException  # type: ignore  # noqa
     from cleo.io.io import IO
 
-
-__all__ = ["CleoException", "parse_dependency_specification", "PoetryVersion", "detect_poetry_version"]
+if TYPE_CHECKING:
+    # poetry-import library
+    from poetry_import.cache import ArtifactStore
+
+
+__all__ = [
+    "CleoException",
+    "parse_dependency_specification",
+    "parse_many",
+    "is_remote_requirement",
+    "PoetryVersion",
+    "detect_poetry_version",
+    "RequirementsParserProvider",
+    "requirements_parser",
+    "RequirementTokens",
+    "tokenize_requirement",
+    "parse_simple_specification",
+    "parse_cache_info",
+    "poetry_cache_dir",
+    "package_version",
+    "poetry_installer",
+]
 
 
 PYTHON_MIN_SUPPORT_MINOR_VERSION = 8  # i.e. 3.8
+PARSE_CACHE_SIZE = 8192  # distinct requirement lines kept by parse_dependency_specification
+# Remote requirements are downloaded by Poetry, which keeps one pooled keep-alive session per host
+# (10 connections by default), so a few more workers would only queue on the connection pool
+URL_RESOLVE_WORKERS = 8
+# How many lines `parse_many` reads ahead of a remote requirement that is still being resolved
+URL_RESOLVE_WINDOW = 256
+# Inspecting a local project may build it through its PEP 517 backend, which runs in a subprocess,
+# so they are inspected on a few threads whatever the number of CPUs
+LOCAL_INSPECT_WORKERS = 8
 
 
 class PoetryVersion(Enum):
@@ -85,59 +121,503 @@ def detect_poetry_version(data: dict[str, Any], specified_version: Optional[str]
         return PoetryVersion.V2
 
 
-try:
-    # Check for poetry v2 first
-    spec = importlib.util.find_spec("poetry.core.utils.dependency_specification")
-    if spec is not None:
-        # Using Poetry v2
+def poetry_cache_dir() -> Path:
+    """Locate Poetry's cache directory, honouring `POETRY_CACHE_DIR` like Poetry does.
+
+    Returns:
+        Path: The cache directory Poetry uses on this machine.
+    """
+    if os.getenv("POETRY_CACHE_DIR"):
+        return Path(os.environ["POETRY_CACHE_DIR"])
+
+    try:
         # pypi library
-        from poetry.core.utils.dependency_specification import RequirementsParser
+        from poetry.locations import DEFAULT_CACHE_DIR
 
-        tmpdir = mktemp(suffix="cache", prefix="poetry_import")
+        return Path(DEFAULT_CACHE_DIR)
+    except ImportError:
+        pass
 
-        # Create a simple artifact cache
-        class SimpleArtifactCache:
-            def __init__(self, cache_dir: Path):
-                self.cache_dir = cache_dir
+    try:
+        # pypi library
+        from poetry.locations import CACHE_DIR  # type: ignore  # noqa
 
-        req_parser = RequirementsParser(artifact_cache=SimpleArtifactCache(cache_dir=Path(tmpdir)))
+        return Path(CACHE_DIR)
+    except ImportError:
+        return Path.home() / ".cache" / "pypoetry"
 
-        def parse_dependency_specification(line: str):
-            return req_parser.parse(line)
-    else:
-        # Try poetry v1 paths
-        # standard library
-        from pathlib import Path
-        from tempfile import mktemp
 
+def package_version(distribution: str) -> str:
+    """Return the installed version of a distribution, or "unknown" if it cannot be found."""
+    try:
+        # standard library
+        from importlib.metadata import version
+    except ImportError:
         # pypi library
-        from poetry.utils.cache import ArtifactCache
-        from poetry.utils.dependency_specification import RequirementsParser
+        from importlib_metadata import version  # type: ignore  # noqa
 
-        tmpdir = mktemp(suffix="cache", prefix="poetry_import")
+    try:
+        return version(distribution)
+    except Exception:
+        return "unknown"
 
-        req_parser = RequirementsParser(artifact_cache=ArtifactCache(cache_dir=Path(tmpdir)))
 
-        def parse_dependency_specification(line: str):
-            return req_parser.parse(line)
+def poetry_installer(io: "IO", project_dir: Path, disable_cache: bool = False) -> Any:
+    """Load a Poetry project and create an installer for it, the way `poetry install` does.
+
+    The project, its repository pool and its environment are built once; the installer can then solve,
+    install and write the lock file in a single run.
+
+    Args:
+        io (IO): Where the installer reports progress.
+        project_dir (Path): The directory holding the project's pyproject.toml.
+        disable_cache (bool): Whether Poetry was run with `--no-cache`, so no source or artifact cache is used.
+
+    Raises:
+        ImportError: If this Poetry version does not provide the APIs needed.
+
+    Returns:
+        Any: A `poetry.installation.installer.Installer`.
+    """
+    # pypi library
+    from poetry.factory import Factory
+    from poetry.installation.installer import Installer
+    from poetry.utils.env import EnvManager
+
+    if "disable_cache" in inspect.signature(Factory.create_poetry).parameters:
+        poetry = Factory().create_poetry(project_dir, disable_cache=disable_cache)
+    else:
+        poetry = Factory().create_poetry(project_dir)
+    if "io" in inspect.signature(EnvManager.__init__).parameters:
+        # Using Poetry v2
+        env = EnvManager(poetry, io=io).create_venv()
+    else:
+        # Poetry v1 takes the IO when creating the environment
+        env = EnvManager(poetry).create_venv(io)
+
+    if "disable_cache" in inspect.signature(Installer.__init__).parameters:
+        return Installer(
+            io, env, poetry.package, poetry.locker, poetry.pool, poetry.config, disable_cache=disable_cache
+        )
+    return Installer(io, env, poetry.package, poetry.locker, poetry.pool, poetry.config)
+
+
+class SimpleArtifactCache:
+    """Minimal artifact cache for the Poetry versions that only need a cache directory."""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+
+
+def _parse_minimal_specification(line: str) -> "dict[str, str]":
+    """Simple implementation to parse requirements when Poetry is not available"""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return {}
+
+    # Handle simple name==version format
+    if "==" in line:
+        name, version = line.split("==", 1)
+        return {"name": name.strip(), "version": version.strip()}
+
+    # Handle name format without version - provide empty version string
+    return {"name": line.strip(), "version": ""}
+
+
+class RequirementsParserProvider:
+    """Process-wide, lazily created requirements parser.
+
+    Nothing is imported or created until the first requirement is parsed: the Poetry version branch is
+    picked, the `RequirementsParser` is built once on the persistent artifact store, then shared by every
+    caller. Archives downloaded to inspect URL requirements stay in the store across runs; `close` trims
+    the store to its size budget and resets the provider, so the next parse starts afresh.
+    """
+
+    def __init__(self) -> None:
+        self._parse: "Optional[Callable[[str], dict[str, Any]]]" = None
+        self._artifacts: "Optional[ArtifactStore]" = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the parser has been created."""
+        return self._parse is not None
+
+    def get(self) -> "Callable[[str], dict[str, Any]]":
+        """Return the parse function, creating the parser on first use.
+
+        Returns:
+            Callable[[str], dict[str, Any]]: A function parsing one requirement line into a dependency dict.
+        """
+        if self._parse is None:
+            with self._lock:
+                if self._parse is None:
+                    self._parse = self._create()
+        return self._parse
+
+    def close(self) -> None:
+        """Drop the parser and evict the least recently used archives over the store budget."""
+        with self._lock:
+            if self._artifacts is not None:
+                self._artifacts.evict()
+            self._parse = None
+            self._artifacts = None
+
+    def _create(self) -> "Callable[[str], dict[str, Any]]":
+        try:
+            return self._create_requirements_parser().parse
+        except ImportError:
+            pass
+
+        # Legacy fallback
+        try:
+            # pypi library
+            from poetry.utils.dependency_specification import parse_dependency_specification  # type: ignore  # noqa
+
+            return parse_dependency_specification
+        except ImportError:
+            # Minimal implementation if all else fails
+            return _parse_minimal_specification
+
+    def _create_requirements_parser(self) -> Any:
+        # Check for poetry v2 first
+        spec = importlib.util.find_spec("poetry.core.utils.dependency_specification")
+        if spec is not None:
+            # Using Poetry v2
+            # pypi library
+            from poetry.core.utils.dependency_specification import RequirementsParser
+
+            artifact_cache_cls: Any = SimpleArtifactCache
+        else:
+            # Try poetry v1 paths
+            # pypi library
+            from poetry.utils.cache import ArtifactCache
+            from poetry.utils.dependency_specification import RequirementsParser  # type: ignore  # noqa
+
+            artifact_cache_cls = ArtifactCache
+
+        # poetry-import library
+        from poetry_import.cache import ArtifactStore
+
+        self._artifacts = ArtifactStore.default()
+        return RequirementsParser(artifact_cache=self._artifacts.artifact_cache(artifact_cache_cls))
+
+
+requirements_parser = RequirementsParserProvider()
+atexit.register(requirements_parser.close)
+
+
+_NAME_PATTERN = r"[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?"
+# Only versions already in their canonical PEP 440 spelling, so they come out of Poetry unchanged
+_VERSION_PATTERN = (
+    r"(?:0|[1-9][0-9]*)(?:\.(?:0|[1-9][0-9]*))*"
+    r"(?:(?:a|b|rc)(?:0|[1-9][0-9]*))?(?:\.post(?:0|[1-9][0-9]*))?(?:\.dev(?:0|[1-9][0-9]*))?"
+)
+_SPECIFIER_OPERATORS = r"===|~=|==|!=|<=|>=|<|>"
+_REQUIREMENT_RE = re.compile(
+    rf"""
+    ^\s*(?P<name>{_NAME_PATTERN})
+    \s*(?:\[(?P<extras>[^\]]*)\])?
+    \s*(?P<specifiers>(?:{_SPECIFIER_OPERATORS})[^;]*?)?
+    \s*(?:;\s*(?P<marker>.*?))?
+    \s*(?P<comment>\s\#.*)?$
+    """,
+    re.VERBOSE,
+)
+_SPECIFIER_CLAUSE_RE = re.compile(rf"\s*({_SPECIFIER_OPERATORS})\s*([^\s,;]+)\s*(?:,(?!\s*$)|$)")
+_SIMPLE_MARKER_RE = re.compile(
+    r"""
+    ^(?P<name>[a-z_]+)\s*(?P<op>==|!=|>=|<=|>|<)\s*
+    (?P<quote>["'])(?P<value>[A-Za-z0-9_.-]*)(?P=quote)$
+    """,
+    re.VERBOSE,
+)
+_NAME_RE = re.compile(rf"^{_NAME_PATTERN}$")
+_VERSION_RE = re.compile(rf"^{_VERSION_PATTERN}$")
+_RELEASE_RE = re.compile(r"^(?:0|[1-9][0-9]*)(?:\.(?:0|[1-9][0-9]*))*$")
+_PYTHON_VERSION_RE = re.compile(r"^[0-9]+\.[0-9]+$")
+_STRING_MARKERS = frozenset(
+    {
+        "os_name",
+        "sys_platform",
+        "platform_system",
+        "platform_machine",
+        "platform_python_implementation",
+        "implementation_name",
+    }
+)
+_ARCHIVE_SUFFIXES = (".zip", ".whl", ".tar", ".tgz", ".tbz", ".txz", ".tlz", ".gz", ".bz2", ".xz", ".lz", ".lzma")
+_CANONICAL_NAME_RE = re.compile(r"[-_.]+")
+_REMOTE_REQUIREMENT_RE = re.compile(r"^\s*(?:https?|git\+(?:https?|ssh))://", re.IGNORECASE)
+
+
+def canonicalize_name(name: str) -> str:
+    """Normalize a package name as described in PEP 503, e.g. `Pydantic_Settings` -> `pydantic-settings`."""
+    return _CANONICAL_NAME_RE.sub("-", name).lower()
+
+
+def _release(version: str) -> "tuple[int, ...]":
+    release = [int(part) for part in version.split(".")]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    return tuple(release)
+
+
+class RequirementTokens(NamedTuple):
+    """The parts of a PEP 508 requirement on a named package, as written.
+
+    Attributes:
+        name (str): The package name, e.g. `Django`.
+        extras (tuple[str, ...]): The extras, stripped but not validated, e.g. `("socks",)`.
+        specifiers (tuple[tuple[str, str], ...]): The version clauses, e.g. `(("~=", "1.2"),)`.
+        marker (str | None): The environment marker, e.g. `python_version < "3.9"`.
+        comment (str | None): A trailing `# ...` comment, which pip-compile writes after requirements.
+    """
+
+    name: str
+    extras: "tuple[str, ...]"
+    specifiers: "tuple[tuple[str, str], ...]"
+    marker: "Optional[str]"
+    comment: "Optional[str]"
+
+    @property
+    def pin(self) -> "Optional[str]":
+        """The specifier as written when it is a single `==` or `~=` clause, e.g. `~=1.2`."""
+        if len(self.specifiers) == 1 and self.specifiers[0][0] in ("==", "~="):
+            return "".join(self.specifiers[0])
+        return None
+
+
+def tokenize_requirement(line: str) -> "Optional[RequirementTokens]":
+    """Split a requirement line into its name, extras, specifier clauses and marker in a single pass.
+
+    Args:
+        line: A requirement line, e.g. `requests[socks]>=2.0,<3; sys_platform == "linux"`
+
+    Returns:
+        The tokens, or None when the line is not a requirement on a named package with an optional
+        comma-separated specifier (URLs, paths, VCS, parenthesized specifiers, ...).
+    """
+    match = _REQUIREMENT_RE.match(line)
+    if match is None:
+        return None
+
+    name, extras, specifiers, marker, comment = match.group("name", "extras", "specifiers", "marker", "comment")
+
+    clauses: "list[tuple[str, str]]" = []
+    if specifiers:
+        position, end = 0, len(specifiers)
+        while position < end:
+            clause = _SPECIFIER_CLAUSE_RE.match(specifiers, position)
+            if clause is None:
+                return None
+            clauses.append((clause.group(1), clause.group(2)))
+            position = clause.end()
+
+    return RequirementTokens(
+        name,
+        tuple(extra.strip() for extra in extras.split(",")) if extras is not None else (),
+        tuple(clauses),
+        marker,
+        comment.lstrip() if comment is not None else None,
+    )
+
+
+def parse_simple_specification(line: str) -> "Optional[dict[str, Any]]":
+    """Parse the common PEP 508 shapes without going through Poetry.
+
+    Handles `name[extras]<specifier>; <marker>` where the specifier is a single clause, a wildcard
+    or a lower/upper bound pair, and the marker is a single comparison. The result has the same shape
+    as Poetry's `RequirementsParser.parse`.
+
+    Args:
+        line: A requirement line, e.g. `requests[socks]>=2.0; sys_platform == "linux"`
+
+    Returns:
+        The dependency specification, or None when the line needs Poetry (URLs, paths, VCS, editable
+        installs, or specifiers and markers Poetry would rewrite).
+    """
+    tokens = tokenize_requirement(line)
+    return _simple_specification(tokens) if tokens is not None else None
+
+
+def _simple_specification(tokens: RequirementTokens, keep_operators: bool = False) -> "Optional[dict[str, Any]]":
+    name, extras, specifiers, marker, comment = tokens
+    pin = tokens.pin if keep_operators else None
+
+    if name.lower().endswith(_ARCHIVE_SUFFIXES):
+        # Poetry treats these as local archives
+        return None
+
+    if comment is not None and (" ;" in comment or not (specifiers or extras or marker)):
+        return None
+
+    specification: "dict[str, Any]" = {}
+
+    if len(specifiers) == 1:
+        ((op, version),) = specifiers
+        if pin:
+            specification["version"] = pin
+        elif version.endswith(".*"):
+            if op not in ("==", "!=") or not _RELEASE_RE.match(version[:-2]):
+                return None
+            specification["version"] = f"{op}{version}"
+        elif op == "==" and _VERSION_RE.match(version):
+            specification["version"] = version
+        elif op in ("!=", ">=", "<=", ">", "<") and _RELEASE_RE.match(version):
+            specification["version"] = f"{op}{version}"
+        else:
+            # Poetry rewrites `~=`, `===` and bounds on pre-, post- and dev-releases
+            return None
+    elif len(specifiers) == 2:
+        (op, version), (upper_op, upper_version) = specifiers
+        if (
+            op not in (">=", ">")
+            or upper_op not in ("<=", "<")
+            or not _RELEASE_RE.match(version)
+            or not _RELEASE_RE.match(upper_version)
+            or _release(version) >= _release(upper_version)
+        ):
+            return None
+        specification["version"] = f"{op}{version},{upper_op}{upper_version}"
+    elif specifiers:
+        return None
+
+    if marker is not None:
+        match = _SIMPLE_MARKER_RE.match(marker)
+        if match is None:
+            return None
+        marker_name, marker_op, marker_value = match.group("name", "op", "value")
+        if marker_name == "python_version":
+            if not _PYTHON_VERSION_RE.match(marker_value):
+                return None
+        elif marker_name not in _STRING_MARKERS or marker_op not in ("==", "!="):
+            return None
+        specification["markers"] = f'{marker_name} {marker_op} "{marker_value}"'
+
+    if extras:
+        if not all(_NAME_RE.match(extra) for extra in extras):
+            return None
+        specification["extras"] = sorted({canonicalize_name(extra) for extra in extras})
+
+    if not specification:
+        # Poetry keeps a bare name as written
+        return {"name": name}
+
+    specification["name"] = canonicalize_name(name)
+    return specification
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_cached(line: str, keep_operators: bool = False) -> "dict[str, Any]":
+    tokens = tokenize_requirement(line)
+    if tokens is not None:
+        specification = _simple_specification(tokens, keep_operators)
+        if specification is not None:
+            return specification
+
+    specification = requirements_parser.get()(line)
+    if keep_operators and tokens is not None and tokens.pin:
+        # the version as the tokenizer read it, the markers and extras as Poetry normalizes them
+        specification["version"] = tokens.pin
+    return specification
+
+
+def parse_dependency_specification(line: str, keep_operators: bool = False) -> "dict[str, Any]":
+    """Parse a single requirement line with the shared requirements parser.
+
+    Results are memoized per stripped line, so a requirement repeated across group and constraints
+    files is parsed once. Every call returns a fresh copy that callers are free to modify.
+
+    Args:
+        line: A requirement line, e.g. `requests[socks]>=2.0; python_version < "3.9"`
+        keep_operators: Keep a single `==` or `~=` clause as written, e.g. `~=1.2` rather than
+            Poetry's `>=1.2,<2.0`, whether or not the line needs Poetry for its markers or extras.
+
+    Returns:
+        The dependency specification, e.g. `{"name": "requests", "version": ">=2.0", ...}`
+    """
+    return _copy_specification(_parse_cached(line.strip(), keep_operators))
+
+
+def parse_many(lines: "Iterable[str]", keep_operators: bool = False) -> "Iterator[dict[str, Any]]":
+    """Parse a batch of requirement lines lazily, in order.
+
+    Identical lines within the batch are parsed once; first occurrences go through the same memoized fast
+    path and Poetry fallback as `parse_dependency_specification`, repeated ones are copied from the result
+    of the first without looking the parse cache up again. Every result is a fresh copy.
+
+    Requirements Poetry has to download or clone to learn their name (bare archive URLs, VCS URLs) are
+    resolved concurrently on up to `URL_RESOLVE_WORKERS` threads, reading up to `URL_RESOLVE_WINDOW`
+    lines ahead of the oldest one still in flight; results are still yielded in the order of `lines`.
+
+    Args:
+        lines: Requirement lines, e.g. the logical lines of a requirements file.
+        keep_operators: Keep a single `==` or `~=` clause as written, see `parse_dependency_specification`.
+
+    Yields:
+        The dependency specification of each line.
+    """
+    parsed: "dict[str, dict[str, Any]]" = {}
+    resolving: "dict[str, Future[dict[str, Any]]]" = {}
+    pending: "deque[str]" = deque()
+    executor: "Optional[ThreadPoolExecutor]" = None
+
+    def ready() -> bool:
+        future = resolving.get(pending[0])
+        return future is None or future.done() or len(pending) > URL_RESOLVE_WINDOW
+
+    def take() -> "dict[str, Any]":
+        line = pending.popleft()
+        specification = parsed.get(line)
+        if specification is None:
+            future = resolving.get(line)
+            specification = future.result() if future is not None else _parse_cached(line.strip(), keep_operators)
+            parsed[line] = specification
+        return _copy_specification(specification)
 
-except ImportError:
-    # Legacy fallback
     try:
-        # pypi library
-        from poetry.utils.dependency_specification import parse_dependency_specification  # type: ignore  # noqa
-    except ImportError:
-        # Minimal implementation if all else fails
-        def parse_dependency_specification(line: str) -> dict[str, str]:
-            """Simple implementation to parse requirements when Poetry is not available"""
-            line = line.strip()
-            if not line or line.startswith("#"):
-                return {}
-
-            # Handle simple name==version format
-            if "==" in line:
-                name, version = line.split("==", 1)
-                return {"name": name.strip(), "version": version.strip()}
-
-            # Handle name format without version - provide empty version string
-            return {"name": line.strip(), "version": ""}
+        for line in lines:
+            specification = parsed.get(line)
+            if specification is not None and not pending:
+                # a repeated line, with nothing ahead of it to wait for
+                yield _copy_specification(specification)
+                continue
+
+            if specification is None and line not in resolving and is_remote_requirement(line):
+                if executor is None:
+                    executor = ThreadPoolExecutor(URL_RESOLVE_WORKERS, thread_name_prefix="poetry-import-url")
+                resolving[line] = executor.submit(_parse_cached, line.strip(), keep_operators)
+            pending.append(line)
+
+            while pending and ready():
+                yield take()
+
+        while pending:
+            yield take()
+    finally:
+        if executor is not None:
+            for future in resolving.values():
+                future.cancel()
+            executor.shutdown(wait=False)
+
+
+def is_remote_requirement(line: str) -> bool:
+    """Whether Poetry has to fetch a requirement to find its name, e.g. `https://host/pkg-1.0.tar.gz`.
+
+    Requirements written as `name @ url` declare their name and are parsed without any download.
+    """
+    return _REMOTE_REQUIREMENT_RE.match(line) is not None
+
+
+def _copy_specification(specification: "dict[str, Any]") -> "dict[str, Any]":
+    copy = specification.copy()
+    for key, value in copy.items():
+        if isinstance(value, (list, dict)):
+            copy[key] = value.copy()
+    return copy
+
+
+def parse_cache_info() -> Any:
+    """Return the hit/miss statistics of the parse cache, as `functools.lru_cache` reports them."""
+    return _parse_cached.cache_info()
@@ -0,0 +1,398 @@
+"""
+Copyright 2024 Ben CHEN
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import annotations
+
+# standard library
+import hashlib
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+# poetry-import library
+from poetry_import.backport import package_version, poetry_cache_dir
+
+__all__ = ["cache_root", "ParseCache", "LocalMetadataCache", "ArtifactStore", "FingerprintStore"]
+
+
+PARSE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # i.e. 64 MiB
+ARTIFACT_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # i.e. 1 GiB
+PARSE_CACHE_FORMAT = 4  # bump whenever the layout of the cached records changes
+FINGERPRINT_FORMAT = 1  # bump whenever what goes into an import fingerprint changes
+HASH_CHUNK_SIZE = 64 * 1024  # files are hashed this many bytes at a time, never read whole
+# The files a local project is built from; its metadata is cached until one of them changes
+LOCAL_METADATA_FILES = ("pyproject.toml", "setup.cfg", "setup.py")
+
+
+def cache_root() -> Path:
+    """Root directory of the plugin caches.
+
+    `POETRY_IMPORT_CACHE_DIR` takes precedence, otherwise a `poetry-import` folder in Poetry's cache dir.
+
+    Returns:
+        Path: The cache root, which may not exist yet.
+    """
+    custom_dir = os.getenv("POETRY_IMPORT_CACHE_DIR")
+    if custom_dir:
+        return Path(custom_dir)
+    return poetry_cache_dir() / "poetry-import"
+
+
+class ParseCache:
+    """On-disk cache of parsed requirements files.
+
+    Each entry holds the dependency specifications of one file as JSON lines, keyed by its resolved path, size,
+    mtime and content hash, plus the plugin and Poetry versions that produced it. Entries are
+    evicted least recently used first once the directory grows over `max_bytes`.
+
+    Attributes:
+        directory (Path): Where the entries are stored.
+        max_bytes (int): Size budget of the directory.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that were not.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = PARSE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._versions = (package_version("poetry-import-plugin"), package_version("poetry"))
+
+    @classmethod
+    def default(cls) -> "ParseCache":
+        """Create the cache in its default location under `cache_root`."""
+        return cls(cache_root() / "parse")
+
+    def key(self, path: Path) -> str:
+        """Compute the cache key of a requirements file.
+
+        Args:
+            path (Path): The requirements file.
+
+        Returns:
+            str: A hex digest identifying this exact file content and toolchain.
+        """
+        stat = path.stat()
+        fingerprint = {
+            "path": str(path.resolve()),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "sha256": _sha256(path),
+            "versions": self._versions,
+            "format": PARSE_CACHE_FORMAT,
+        }
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str) -> "Optional[list[dict[str, Any]]]":
+        """Load the records stored under `key`.
+
+        Args:
+            key (str): A key computed by `key`.
+
+        Returns:
+            Optional[list[dict[str, Any]]]: The records, or None on a miss or an unreadable entry.
+        """
+        entry = self.directory / f"{key}.jsonl"
+        try:
+            with entry.open() as f:
+                records = [json.loads(line) for line in f]
+            os.utime(entry)  # mark as recently used
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return records
+
+    def set(self, key: str, records: "Iterable[dict[str, Any]]") -> None:
+        """Store the records of a file under `key`.
+
+        Args:
+            key (str): A key computed by `key`.
+            records (Iterable[dict[str, Any]]): The parsed dependency specifications of the file.
+        """
+        with self.writer(key) as write:
+            for record in records:
+                write(record)
+
+    @contextmanager
+    def writer(self, key: str) -> "Iterator[Callable[[dict[str, Any]], None]]":
+        """Stream records into the entry `key`, one line each.
+
+        The entry only becomes visible once the block completes; it is discarded if the block raises or
+        the enclosing generator is closed early. Old entries are evicted afterwards if over budget.
+
+        Args:
+            key (str): A key computed by `key`.
+
+        Yields:
+            Callable[[dict[str, Any]], None]: A function appending one record to the entry.
+        """
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            f = NamedTemporaryFile("w", dir=self.directory, suffix=".tmp", delete=False)
+        except OSError:
+            # caching is best effort, a read-only cache dir must not fail the import
+            yield lambda record: None
+            return
+
+        try:
+            with f:
+                yield lambda record: f.write(json.dumps(record) + "\n")
+        except BaseException:
+            os.unlink(f.name)
+            raise
+
+        try:
+            os.replace(f.name, self.directory / f"{key}.jsonl")
+        except OSError:
+            os.unlink(f.name)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the directory fits in `max_bytes`."""
+        entries = []
+        for entry in self.directory.glob("*.jsonl"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        _evict_least_recently_used(entries, self.max_bytes, lambda entry: entry.unlink())
+
+    def clear(self) -> None:
+        """Remove every entry of the cache."""
+        if not self.directory.is_dir():
+            return
+        for entry in self.directory.iterdir():
+            if entry.suffix in (".jsonl", ".tmp"):
+                try:
+                    entry.unlink()
+                except OSError:
+                    pass
+
+
+class LocalMetadataCache(ParseCache):
+    """On-disk cache of the metadata of local projects, such as the package name of `-e ./libs/core`.
+
+    Finding it may mean building the project through its PEP 517 backend, so entries are keyed by the
+    content of the project's `pyproject.toml`, `setup.cfg` and `setup.py` (or of the archive itself)
+    rather than by mtime, and only go stale when those change.
+    """
+
+    @classmethod
+    def default(cls) -> "LocalMetadataCache":
+        """Create the cache in its default location under `cache_root`."""
+        return cls(cache_root() / "local")
+
+    def key(self, path: Path) -> str:
+        """Compute the cache key of a local project.
+
+        Args:
+            path (Path): The resolved project directory, or archive.
+
+        Returns:
+            str: A hex digest identifying this project configuration and toolchain.
+        """
+        files = [path / name for name in LOCAL_METADATA_FILES] if path.is_dir() else [path]
+        fingerprint = {
+            "path": str(path),
+            "files": {f.name: _sha256(f) if f.is_file() else None for f in files},
+            "versions": self._versions,
+            "format": PARSE_CACHE_FORMAT,
+        }
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
+
+class ArtifactStore:
+    """Persistent cache of the archives Poetry downloads to inspect URL requirements.
+
+    The layout is Poetry's own `ArtifactCache` one: every archive lives in a directory named after the
+    sha256 of its URL (and hash fragment), e.g. `ab/cd/ef/0123.../pkg-1.0.tar.gz`, so a URL seen before
+    costs no network I/O. Those directories are evicted least recently used first once the store grows
+    over `max_bytes`.
+
+    Attributes:
+        directory (Path): The root of the store.
+        max_bytes (int): Size budget of the store.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = ARTIFACT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def default(cls) -> "ArtifactStore":
+        """Create the store in its default location under `cache_root`."""
+        return cls(cache_root() / "artifacts")
+
+    def artifact_cache(self, artifact_cache_cls: Any) -> Any:
+        """Create a Poetry artifact cache backed by this store.
+
+        Args:
+            artifact_cache_cls: Poetry's artifact cache class, which takes the cache directory as `cache_dir`.
+
+        Returns:
+            Any: An instance of a subclass of `artifact_cache_cls` that marks the archives it returns as used.
+        """
+        store = self
+
+        class RecentlyUsedArtifactCache(artifact_cache_cls):  # type: ignore
+            def get_cached_archive_for_link(self, *args: Any, **kwargs: Any) -> Any:
+                archive = super().get_cached_archive_for_link(*args, **kwargs)
+                if archive is not None:
+                    store.touch(Path(archive))
+                return archive
+
+        return RecentlyUsedArtifactCache(cache_dir=self.directory)
+
+    def touch(self, archive: Path) -> None:
+        """Mark the entry holding `archive` as recently used."""
+        try:
+            os.utime(archive.parent)
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the store fits in `max_bytes`."""
+        entries = []
+        for entry in self.directory.glob("*/*/*/*"):
+            try:
+                sizes = [f.stat().st_size for f in entry.rglob("*") if f.is_file()]
+                entries.append((entry.stat().st_mtime, sum(sizes), entry))
+            except OSError:
+                continue
+
+        _evict_least_recently_used(entries, self.max_bytes, lambda entry: shutil.rmtree(entry))
+
+    def clear(self) -> None:
+        """Remove every archive of the store."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class FingerprintStore:
+    """Fingerprints of the inputs of the last successful import into each pyproject.toml.
+
+    A fingerprint is a key, computed by the caller from what the command was asked to do, and the content
+    hash of every file the import read or wrote: requirements and constraints files, local project
+    metadata, the pyproject.toml itself and, when locking, poetry.lock. It is stored in a sidecar JSON
+    file named after the resolved pyproject.toml path, so the project itself carries no extra state.
+
+    Attributes:
+        directory (Path): Where the fingerprints are stored.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._versions = (package_version("poetry-import-plugin"), package_version("poetry"))
+
+    @classmethod
+    def default(cls) -> "FingerprintStore":
+        """Create the store in its default location under `cache_root`."""
+        return cls(cache_root() / "fingerprints")
+
+    def matches(self, pyproject: Path, key: str) -> bool:
+        """Whether the last import into `pyproject` had the same key and none of its files changed since.
+
+        Args:
+            pyproject (Path): The pyproject.toml file.
+            key (str): The key of the import about to run.
+
+        Returns:
+            bool: True if the import would be a no-op.
+        """
+        try:
+            fingerprint = json.loads(self._path(pyproject).read_text())
+        except (OSError, ValueError):
+            return False
+
+        if fingerprint.get("key") != self._key(key):
+            return False
+        return all(_digest(Path(path)) == digest for path, digest in fingerprint.get("files", {}).items())
+
+    def save(self, pyproject: Path, key: str, files: "Iterable[Path]") -> None:
+        """Record a successful import into `pyproject`.
+
+        Args:
+            pyproject (Path): The pyproject.toml file.
+            key (str): The key of the import.
+            files (Iterable[Path]): Every file the import depends on; missing ones are recorded as such.
+        """
+        paths = [pyproject.resolve(), *(path.resolve() for path in files)]
+        fingerprint = {"key": self._key(key), "files": {str(path): _digest(path) for path in paths}}
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            f = NamedTemporaryFile("w", dir=self.directory, suffix=".tmp", delete=False)
+        except OSError:
+            # the fingerprint is best effort, a read-only cache dir must not fail the import
+            return
+
+        with f:
+            json.dump(fingerprint, f, sort_keys=True)
+        try:
+            os.replace(f.name, self._path(pyproject))
+        except OSError:
+            os.unlink(f.name)
+
+    def clear(self) -> None:
+        """Remove every fingerprint, so the next imports run in full."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _path(self, pyproject: Path) -> Path:
+        name = hashlib.sha256(str(pyproject.resolve()).encode()).hexdigest()
+        return self.directory / f"{name}.json"
+
+    def _key(self, key: str) -> str:
+        return hashlib.sha256(json.dumps([key, self._versions, FINGERPRINT_FORMAT]).encode()).hexdigest()
+
+
+def _sha256(path: Path) -> str:
+    # the content hash of a file, read in chunks so a large requirements file is never held whole
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _digest(path: Path) -> "Optional[str]":
+    # the content hash of a file, None if it does not exist (so it appearing counts as a change too)
+    try:
+        return _sha256(path)
+    except OSError:
+        return None
+
+
+def _evict_least_recently_used(
+    entries: "list[tuple[float, int, Path]]", max_bytes: int, remove: "Callable[[Path], None]"
+) -> None:
+    # entries are (last use, size, path); the oldest go first until the total fits the budget
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        try:
+            remove(entry)
+        except OSError:
+            continue
+        total -= size
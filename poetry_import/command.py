@@ -17,25 +17,58 @@ limitations under the License.
 from __future__ import annotations
 
 # standard library
+import difflib
+import itertools
+import json
 import os
-import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, cast
+from typing import Any, Iterable, Iterator, Mapping, Optional, cast
 
 # pypi library
 from cleo.commands.command import Command
+from cleo.formatters.formatter import Formatter
 from cleo.helpers import argument, option
+from cleo.io.outputs.output import Type as OutputType
 from tomlkit import array as tomlkit_array
 from tomlkit import dumps, inline_table, item, parse, table
 
 # poetry-import library
 from poetry_import.backport import (
+    LOCAL_INSPECT_WORKERS,
     CleoException,
     PoetryVersion,
+    canonicalize_name,
     detect_poetry_version,
-    parse_dependency_specification,
+    package_version,
+    parse_cache_info,
+    parse_many,
+    poetry_installer,
+    requirements_parser,
     show_warning,
 )
+from poetry_import.cache import LOCAL_METADATA_FILES, ArtifactStore, FingerprintStore, LocalMetadataCache, ParseCache
+from poetry_import.pyproject import (
+    ROOT_GROUP,
+    DependencyIndex,
+    end_table,
+    extend_array,
+    group_dependencies_table,
+    parse_pep508,
+    write_if_changed,
+)
+from poetry_import.requirements import (
+    ConstraintsIndex,
+    Include,
+    LineKind,
+    LocalRequirement,
+    RequirementLine,
+    RequirementsGraph,
+    is_local_requirement,
+    tokenize_requirements,
+)
+
+DRIFT_EXIT_CODE = 2  # --dry-run and --diff: the import would change pyproject.toml, 1 being an error
 
 
 class ImportReqCommand(Command):
@@ -65,9 +98,10 @@ class ImportReqCommand(Command):
         option(
             "constraint",
             "c",
-            "Specifies a constraint file to apply version restrictions on dependencies during import.",
+            "Specifies a constraint file to apply version restrictions on dependencies during import. "
+            "Can be repeated, later files take precedence.",
             flag=False,
-            multiple=False,
+            multiple=True,
         ),
         option(
             "poetry-version",
@@ -82,7 +116,8 @@ class ImportReqCommand(Command):
             "lock",
             "--lock",
             "Updates the poetry lock file without installing the packages. This is used to ensure that the "
-            "poetry.lock file is in sync with the pyproject.toml file after modifications.",
+            "poetry.lock file is in sync with the pyproject.toml file after modifications. Skipped when the import "
+            "adds or changes no dependency.",
             flag=True,
             multiple=False,
         ),
@@ -97,19 +132,116 @@ class ImportReqCommand(Command):
         option(
             "install",
             "--install",
-            "Runs a poetry installation to install all dependencies defined in pyproject.toml. "
+            "Runs a poetry installation of the dependency groups the import added to or changed, after locking. "
             "This is typically used after updating dependencies to ensure all packages are correctly installed.",
             flag=True,
             multiple=False,
         ),
+        option(
+            "jobs",
+            "j",
+            "Number of requirements files parsed in parallel. Group and line order are kept, so the result "
+            "is the same as with a single job.",
+            flag=False,
+            default="1",
+        ),
+        option(
+            "executor",
+            "--executor",
+            "Kind of worker pool used with --jobs: 'thread' (default), or 'process' for files whose parsing "
+            "is CPU-bound, e.g. many lines Poetry has to resolve.",
+            flag=False,
+            default="thread",
+        ),
+        option(
+            "clear-cache",
+            "--clear-cache",
+            "Removes the cached parse results and downloaded archives of previous imports. "
+            "When no file is given, exits right after.",
+            flag=True,
+            multiple=False,
+        ),
+        option(
+            "dry-run",
+            "--dry-run",
+            "Prints the changes the import would make to pyproject.toml as JSON, without writing it or locking. "
+            f"Exits with {DRIFT_EXIT_CODE} if there are any, e.g. to check requirements files are in sync in CI.",
+            flag=True,
+            multiple=False,
+        ),
+        option(
+            "diff",
+            "--diff",
+            "Prints the changes the import would make to pyproject.toml as a unified diff, without writing it "
+            f"or locking. Exits with {DRIFT_EXIT_CODE} if there are any.",
+            flag=True,
+            multiple=False,
+        ),
+        option(
+            "sync",
+            "--sync",
+            "Makes each group given requirements files match them: besides adding the new dependencies, updates "
+            "the ones whose version specifier changed and removes the ones no longer listed, then reports the "
+            "edits. Only the changed packages are updated in the lock file.",
+            flag=True,
+            multiple=False,
+        ),
+        option(
+            "batch",
+            "--batch",
+            "Imports into the project in this directory instead of the current one; can be repeated to import "
+            "into several projects in a single run. Relative files are found in each project directory, files "
+            "shared between projects are parsed once, and a summary of every project is printed at the end.",
+            flag=False,
+            multiple=True,
+        ),
+        option(
+            "discover",
+            "--discover",
+            "Like --batch, for every project below the current directory with a pyproject.toml and the "
+            "relative files given.",
+            flag=True,
+            multiple=False,
+        ),
+        option(
+            "force",
+            "--force",
+            "Runs the import even if none of its input files, options or pyproject.toml changed since the "
+            "last successful one, which is otherwise skipped.",
+            flag=True,
+            multiple=False,
+        ),
     ]
 
+    _parse_cache: "Optional[ParseCache]" = None
+    _metadata_cache: "Optional[LocalMetadataCache]" = None
+    _jobs = 1
+    _executor = "thread"
+
+    def __init__(self) -> None:
+        super().__init__()
+        # every requirements and constraints file is parsed once per run
+        self._requirements_graph = RequirementsGraph(self._load_requirements_file)
+        self._constraints_files: "dict[Path, ConstraintsIndex]" = {}
+        # the constraints of the groups including the same `-c` files, layered once per run
+        self._layered_constraints: "dict[tuple[Path, ...], tuple[ConstraintsIndex, ConstraintsIndex]]" = {}
+        # package names of the local projects, by resolved path
+        self._local_packages: "dict[Path, str]" = {}
+        # the dependencies the last update added or changed by group, what to lock and install
+        self._changed_dependencies: "dict[str, list[str]]" = {}
+        # the dependencies the last update removed by group, with --sync
+        self._removed_dependencies: "dict[str, list[str]]" = {}
+        # the groups made to match their requirements files, with --sync
+        self._sync_groups: "set[str]" = set()
+        # the project being imported into with --batch or --discover, None for the current directory
+        self._project_dir: "Optional[Path]" = None
+
     def handle(self):
         """Execute the command to import dependencies from files into specified groups.
 
         Orchestrates the reading of requirements.txt files, applying constraints, and integrating
         the dependencies into the project. It handles file and group specifications provided as command arguments
-        and options.
+        and options. With `--batch` or `--discover`, the files are imported into several projects in turn.
 
         Raises:
             FileNotFoundError: If any specified files or the pyproject.toml file cannot be found.
@@ -122,24 +254,28 @@ class ImportReqCommand(Command):
             if verbose:
                 self.line("DEBUG: Starting handle method", style="debug")
 
-            file_groups = self._fromat_tokens()
-            if verbose:
-                self.line(f"DEBUG: Parsed file groups: {file_groups}", style="debug")
+            if self.option("clear-cache"):
+                ParseCache.default().clear()
+                ArtifactStore.default().clear()
+                LocalMetadataCache.default().clear()
+                FingerprintStore.default().clear()
+                self.line("Cleared the parse cache", style="info")
+                if not self.argument("files"):
+                    return 0
 
-            constraints_path = file_groups.pop("constraints", [])
-            constraints = self._parse_constraints_specifications(constraints_path)
-            if verbose:
-                self.line(f"DEBUG: Parsed constraints: {constraints}", style="debug")
+            if not self._no_cache():
+                self._parse_cache = ParseCache.default()
+                self._metadata_cache = LocalMetadataCache.default()
 
-            groups_specs = self._parse_group_specifications(file_groups, constraints)
-            if verbose:
-                self.line(f"DEBUG: Parsed group specifications: {groups_specs}", style="debug")
+            self._jobs, self._executor = self._parse_jobs_options()
 
-            self.update_pyproject_toml(groups_specs)
+            file_groups = self._fromat_tokens()
             if verbose:
-                self.line("DEBUG: Updated pyproject.toml", style="debug")
+                self.line(f"DEBUG: Parsed file groups: {file_groups}", style="debug")
 
-            self.lock_or_install_dependencies()
+            if self.option("batch") or self.option("discover"):
+                return self._import_projects(self._batch_projects(file_groups), file_groups)
+            return self._import(file_groups)
         except Exception as e:
             self.line(f"{e}", style="error")
             # standard library
@@ -149,8 +285,287 @@ class ImportReqCommand(Command):
                 self.line(f"DEBUG: Exception: {e}", style="debug")
                 self.line(f"DEBUG: {traceback.format_exc()}", style="debug")
             return 1
+
+    def _import(self, file_groups: "dict[str, list[str]]") -> int:
+        """Import the requirements files into the pyproject.toml of the project, lock and install.
+
+        Args:
+            file_groups (dict[str, list[str]]): The files of each group, with the `constraints` files if any.
+
+        Returns:
+            int: The exit code, `DRIFT_EXIT_CODE` when previewing changes.
+        """
+        verbose = self.option("verbose")
+        file_groups = {group: self._rebase(files) for group, files in file_groups.items()}
+        constraints_path = [*self._rebase(self.option("constraint") or []), *file_groups.pop("constraints", [])]
+        if self.option("sync"):
+            # the root group is always there, it is only synced when given files
+            self._sync_groups = {group for group, files in file_groups.items() if files}
+
+        fingerprints = FingerprintStore.default()
+        fingerprint_key = self._fingerprint_key(file_groups, constraints_path)
+        if not (self.option("force") or self._no_cache()) and fingerprints.matches(
+            self._pyproject_path(), fingerprint_key
+        ):
+            self._notice(
+                "Nothing changed since the last import, skipping it. Use --force to import anyway.", style="info"
+            )
+            if self.option("dry-run"):
+                self._print_change_set(self._pyproject_path(), False, {})
+            return 0
+
+        constraints = self._parse_constraints_specifications(constraints_path)
+        if verbose:
+            self.line(f"DEBUG: Parsed constraints: {constraints}", style="debug")
+
+        groups_specs = self._parse_group_specifications(file_groups, constraints)
+        if verbose:
+            self.line(f"DEBUG: Parsed group specifications: {groups_specs}", style="debug")
+            cache_info = parse_cache_info()
+            self.line(
+                f"DEBUG: Parse cache: {cache_info.hits} hits, {cache_info.misses} misses, "
+                f"{cache_info.currsize}/{cache_info.maxsize} entries",
+                style="debug",
+            )
+            if self._parse_cache is not None:
+                self.line(
+                    f"DEBUG: File cache: {self._parse_cache.hits} hits, {self._parse_cache.misses} misses",
+                    style="debug",
+                )
+            if self._metadata_cache is not None:
+                self.line(
+                    f"DEBUG: Local metadata cache: {self._metadata_cache.hits} hits, "
+                    f"{self._metadata_cache.misses} misses",
+                    style="debug",
+                )
+
+        changed = self.update_pyproject_toml(groups_specs)
+        if self._previewing():
+            return DRIFT_EXIT_CODE if changed else 0
+        if verbose:
+            self.line("DEBUG: Updated pyproject.toml", style="debug")
+
+        self.lock_or_install_dependencies()
+        fingerprints.save(
+            self._pyproject_path(), fingerprint_key, self._fingerprint_files(file_groups, constraints_path)
+        )
         return 0
 
+    def _parse_jobs_options(self) -> "tuple[int, str]":
+        """Validate the `--jobs` and `--executor` options.
+
+        Returns:
+            tuple[int, str]: The number of workers and the kind of pool, "thread" or "process".
+
+        Raises:
+            CleoException: If the number of jobs is not a positive integer or the executor is unknown.
+        """
+        jobs = self.option("jobs")
+        if not str(jobs).isdigit() or int(jobs) < 1:
+            raise CleoException(f"--jobs expects a positive number, got: {jobs}")
+
+        executor = self.option("executor")
+        if executor not in ("thread", "process"):
+            raise CleoException(f"--executor expects 'thread' or 'process', got: {executor}")
+
+        return int(jobs), executor
+
+    def _no_cache(self) -> bool:
+        """Whether Poetry's global `--no-cache` option was given, e.g. `poetry --no-cache import ...`.
+
+        It turns off the plugin's caches and the check for an unchanged import too, like `--force`.
+        """
+        return self.definition.has_option("no-cache") and bool(self.option("no-cache"))
+
+    def _previewing(self) -> bool:
+        """Whether the import only reports its changes, with `--dry-run` or `--diff`."""
+        return bool(self.option("dry-run") or self.option("diff"))
+
+    def _notice(self, text: str, style: str = "warning") -> None:
+        """Print a message, on stderr when previewing so that stdout only holds the report."""
+        if self._previewing():
+            self.line_error(text, style=style)
+        else:
+            self.line(text, style=style)
+
+    def _pyproject_path(self) -> Path:
+        """The pyproject.toml to update, `PYPROJECT_CUSTOM_PATH` taking precedence over the working directory.
+
+        In batch mode, the pyproject.toml of the project being imported into.
+        """
+        if self._project_dir is not None:
+            return self._project_dir / "pyproject.toml"
+        return Path(os.getenv("PYPROJECT_CUSTOM_PATH", "pyproject.toml"))
+
+    def _working_dir(self) -> Path:
+        """The directory relative files and local projects are found in, like pip: the working directory.
+
+        In batch mode, the directory of the project being imported into.
+        """
+        return self._project_dir if self._project_dir is not None else Path.cwd()
+
+    def _rebase(self, paths: "Iterable[str]") -> "list[str]":
+        """The paths given on the command line, relative ones found in the project directory in batch mode."""
+        if self._project_dir is None:
+            return list(paths)
+        return [str(self._project_dir / fp) for fp in paths]
+
+    def _batch_projects(self, file_groups: "dict[str, list[str]]") -> "list[Path]":
+        """The project directories given with `--batch` and found with `--discover`.
+
+        Args:
+            file_groups (dict[str, list[str]]): The files of each group, a discovered project has the relative ones.
+
+        Raises:
+            CleoException: If no project was given or found.
+
+        Returns:
+            list[Path]: The absolute project directories, without duplicates.
+        """
+        projects = [Path(directory).resolve() for directory in self.option("batch") or []]
+        if self.option("discover"):
+            files = [Path(fp) for group in file_groups.values() for fp in group if not Path(fp).is_absolute()]
+            for root, directories, filenames in os.walk(Path.cwd()):
+                # virtual environments, caches and hidden directories hold no project to import into
+                directories[:] = sorted(
+                    directory
+                    for directory in directories
+                    if not directory.startswith((".", "__"))
+                    and directory != "node_modules"
+                    and not (Path(root) / directory / "pyvenv.cfg").is_file()
+                )
+                if "pyproject.toml" in filenames and all((Path(root) / fp).is_file() for fp in files):
+                    projects.append(Path(root).resolve())
+
+        if not projects:
+            raise CleoException("No project to import into: no directory has a pyproject.toml and the files given")
+        return list(dict.fromkeys(projects))
+
+    def _import_projects(self, projects: "list[Path]", file_groups: "dict[str, list[str]]") -> int:
+        """Import the requirements files into each project in turn, then print a summary.
+
+        A project is imported as from its own directory, so relative files and local projects are found
+        there, without changing the working directory. The requirements graph and the parse caches are
+        shared: a file included by every project, e.g. common base requirements, is parsed once, its local
+        projects being resolved against each project directory, and with `--jobs` the files of all the
+        projects are parsed up front over the worker pool. A failing project does not stop the others.
+
+        Args:
+            projects (list[Path]): The absolute project directories.
+            file_groups (dict[str, list[str]]): The files of each group, with the `constraints` files if any.
+
+        Returns:
+            int: 1 if any project failed, else `DRIFT_EXIT_CODE` if previewing changes to any project, else 0.
+        """
+        verbose = self.option("verbose")
+        cwd = Path.cwd()
+
+        if self._jobs > 1:
+            paths = [
+                project / fp
+                for project in projects
+                for group, files in file_groups.items()
+                if group != "constraints"
+                for fp in files
+            ]
+            try:
+                self._requirements_graph.preload(
+                    [path for path in paths if path.is_file()], self._load_requirements_files
+                )
+            except Exception as e:
+                # reported by the projects including the file
+                if verbose:
+                    self.line(f"DEBUG: Preloading the requirements files failed: {e}", style="debug")
+
+        results: "dict[Path, tuple[int, str]]" = {}
+        for project in projects:
+            self._notice(f"Importing into {self._relative_to(project, cwd)}", style="info")
+            try:
+                if not (project / "pyproject.toml").is_file():
+                    raise FileNotFoundError(f"pyproject.toml not found in {project}")
+                self._project_dir = project
+                status = self._import(file_groups)
+                results[project] = (status, "out of sync" if status == DRIFT_EXIT_CODE else "ok")
+            except Exception as e:
+                self.line(f"{e}", style="error")
+                results[project] = (1, f"failed: {e}")
+            finally:
+                self._project_dir = None
+                self._sync_groups = set()
+
+        failed = sum(status == 1 for status, _ in results.values())
+        self._notice(
+            f"Imported into {len(results) - failed} of {len(results)} projects, {failed} failed:",
+            style="error" if failed else "info",
+        )
+        for project, (status, outcome) in results.items():
+            self._notice(
+                f"  {self._relative_to(project, cwd)}: {Formatter.escape(outcome)}",
+                style={0: "info", DRIFT_EXIT_CODE: "warning"}.get(status, "error"),
+            )
+
+        if failed:
+            return 1
+        return DRIFT_EXIT_CODE if any(status == DRIFT_EXIT_CODE for status, _ in results.values()) else 0
+
+    @staticmethod
+    def _relative_to(path: Path, cwd: Path) -> str:
+        """`path` relative to `cwd` when below it, for shorter messages."""
+        try:
+            return str(path.relative_to(cwd)) or "."
+        except ValueError:
+            return str(path)
+
+    def _fingerprint_key(self, groups: "dict[str, list[str]]", constraints_path: "list[str]") -> str:
+        """Describe what the import was asked to do, to recognize an identical run.
+
+        Args:
+            groups (dict[str, list[str]]): The files of each group.
+            constraints_path (list[str]): The constraints files.
+
+        Returns:
+            str: The key of the run, for `FingerprintStore`.
+        """
+        return json.dumps(
+            {
+                "cwd": str(self._working_dir()),
+                "groups": {group: [str(Path(fp).resolve()) for fp in files] for group, files in groups.items()},
+                "constraints": [str(Path(fp).resolve()) for fp in constraints_path],
+                "options": {
+                    name: self.option(name) for name in ("poetry-version", "lock", "no-update", "install", "sync")
+                },
+            },
+            sort_keys=True,
+        )
+
+    def _fingerprint_files(self, groups: "dict[str, list[str]]", constraints_path: "list[str]") -> "list[Path]":
+        """Every file the import read, besides pyproject.toml: a change to any of them means a new import.
+
+        Args:
+            groups (dict[str, list[str]]): The files of each group.
+            constraints_path (list[str]): The constraints files.
+
+        Returns:
+            list[Path]: The requirements and constraints files, those they include, and the metadata files
+                of the local projects they require.
+        """
+        paths = [Path(fp) for files in groups.values() for fp in files]
+        files = [*self._requirements_graph.reachable(paths), *(Path(fp).resolve() for fp in constraints_path)]
+        local_packages = dict.fromkeys(
+            entry.resolve(self._working_dir())
+            for fp in paths
+            for entry in self._requirements_graph.walk(fp)
+            if isinstance(entry, LocalRequirement)
+        )
+        for path in local_packages:
+            if path.is_dir():
+                files.extend(path / name for name in LOCAL_METADATA_FILES)
+            else:
+                files.append(path)
+        if self.option("lock") or self.option("install"):
+            files.append(self._pyproject_path().resolve().parent / "poetry.lock")
+        return files
+
     def _fromat_tokens(self) -> "dict[str, list[str]]":
         """Parses command line tokens to organize files into specified groups.
 
@@ -173,7 +588,6 @@ class ImportReqCommand(Command):
         groups: "dict[str, list[str]]" = {}
         current_group = "root"
         i = 0
-        constraint_flag_found = False
         files = 0
 
         # Process arguments instead of raw tokens
@@ -219,13 +633,10 @@ class ImportReqCommand(Command):
                 continue
 
             if arg == "-c":
-                if constraint_flag_found:
-                    raise CleoException("Multiple '-c' flags are not allowed.")
                 if i + 1 >= len(cleaned_args) or cleaned_args[i + 1].startswith("-"):
                     raise CleoException("Missing filename after '-c'.")
                 i += 1  # Move to the filename
-                groups["constraints"] = [cleaned_args[i]]
-                constraint_flag_found = True
+                groups.setdefault("constraints", []).append(cleaned_args[i])
                 i += 1
                 continue
 
@@ -332,147 +743,421 @@ class ImportReqCommand(Command):
     def _parse_group_specifications(
         self,
         groups: "dict[str, list[str]]",
-        constraints: "dict[str, str]",
+        constraints: "Mapping[str, str]",
     ) -> "dict[str, list[dict[str, str]]]":
         """Parse group specifications and organize dependencies accordingly.
 
         Args:
             groups (dict[str, list[str]]): A dictionary mapping group names to file paths.
-            constraints (dict[str, str]): A dictionary of constraints to apply.
+            constraints (Mapping[str, str]): The constraints to apply, e.g. a `ConstraintsIndex` shared by all groups.
 
         Returns:
             dict[str, list[dict[str, str]]]: A dictionary mapping group names to lists of dependency dictionaries.
         """
         dependencies: "dict[str, list[dict[str, str]]]" = {}
+        if not isinstance(constraints, ConstraintsIndex):
+            constraints = ConstraintsIndex(constraints)
+
+        file_paths = [Path(file_path) for files in groups.values() for file_path in files]
+        if self._jobs > 1:
+            self._requirements_graph.preload(file_paths, self._load_requirements_files)
+
+        # inspect all the local projects up front, so the ones not cached yet are inspected in parallel
+        self._inspect_local_packages(
+            entry
+            for fp in file_paths
+            for entry in self._requirements_graph.walk(fp)
+            if isinstance(entry, LocalRequirement)
+        )
 
         for gp, files in groups.items():
-            dependencies[gp] = self._parse_requirements_file(files, constraints)
+            dependencies[gp] = list(self._iter_requirements(files, constraints))
 
         return dependencies
 
     def _parse_requirements_file(
         self,
         file_paths: "list[str]",
-        constraints: "dict[str, str]",
+        constraints: "Mapping[str, str]",
     ) -> "list[dict[str, str]]":
         """Parse dependencies from requirements.txt files and apply constraints.
 
         Args:
             file_paths (list[str]): A list of file paths to requirements.txt files.
-            constraints (dict[str, str]): Dependency constraints to apply.
+            constraints (Mapping[str, str]): Dependency constraints to apply.
 
         Returns:
             list[dict[str, str]]: A list of dependency dictionaries.
         """
+        return list(self._iter_requirements(file_paths, constraints))
 
-        depends: "list[dict[str, str]]" = []
+    def _iter_requirements(
+        self,
+        file_paths: "list[str]",
+        constraints: "Mapping[str, str]",
+    ) -> "Iterator[dict[str, str]]":
+        """Lazily yield the dependencies of requirements.txt files, with constraints applied.
 
-        for file_path in file_paths:
-            fp = Path(file_path)
+        `-r` lines are followed through the requirements graph, so a file shared by several groups or
+        files is only read once. Constraints files found through `-c` lines apply to all the files given,
+        below the constraints passed on the command line. Package names are matched PEP 503 normalized.
 
-            if not fp.is_file():
-                raise FileNotFoundError(f"unable to locate the requirements file: {fp}")
+        Args:
+            file_paths (list[str]): A list of file paths to requirements.txt files.
+            constraints (Mapping[str, str]): Dependency constraints to apply.
 
-            with fp.open() as f:
-                for line in f.readlines():
-                    line_stripped = line.strip()
-                    if not line_stripped or not line_stripped[0].isalpha():
-                        continue
+        Yields:
+            dict[str, str]: A dependency dictionary.
+        """
+        graph = self._requirements_graph
+        paths = [Path(file_path) for file_path in file_paths]
 
-                    # First preserve the original format for version specifiers
-                    original_version = None
+        included = tuple(
+            dict.fromkeys(entry.path for fp in paths for entry in graph.walk(fp) if isinstance(entry, Include))
+        )
+        constraints = self._layer_constraints(constraints, included)
 
-                    # Handle ~= compatibility operator
-                    if "~=" in line_stripped:
-                        match = re.match(r"([a-zA-Z0-9_.-]+)\s*~=\s*([a-zA-Z0-9_.-]+)", line_stripped)
-                        if match:
-                            original_version = f"~={match.group(2)}"
-                    # Handle == exact version
-                    elif "==" in line_stripped:
-                        match = re.match(r"([a-zA-Z0-9_.-]+)\s*==\s*([a-zA-Z0-9_.-]+)", line_stripped)
-                        if match:
-                            original_version = f"=={match.group(2)}"
+        for fp in paths:
+            for deps in graph.walk(fp):
+                if isinstance(deps, Include):
+                    continue
 
-                    deps = cast("dict[str, str]", parse_dependency_specification(line))
+                if isinstance(deps, LocalRequirement):
+                    yield self._local_dependency(deps)
+                    continue
 
-                    if self.is_empty(deps):
+                version = constraints.get(deps.get("name", ""))
+                if version:
+                    if deps.get("url"):
                         continue
+                    # entries are shared between groups, never modify them in place
+                    deps = {**deps, "version": version}
+
+                yield deps
 
-                    # Keep the original version format if we detected a special format
-                    if original_version and "name" in deps:
-                        deps["version"] = original_version
+    def _layer_constraints(self, constraints: "Mapping[str, str]", included: "tuple[Path, ...]") -> ConstraintsIndex:
+        """Layer the constraints files included through `-c` lines below the given constraints.
 
-                    if constraints.get(deps.get("name", "")):
-                        if deps.get("url"):
-                            continue
-                        deps["version"] = constraints[deps["name"]]
+        The index is built once per distinct set of included files, and shared by the groups including them.
 
-                    depends.append(deps)
+        Args:
+            constraints (Mapping[str, str]): The constraints taking precedence, e.g. from the command line.
+            included (tuple[Path, ...]): The included constraints files, a later file overriding an earlier one.
+
+        Returns:
+            ConstraintsIndex: The layered constraints.
+        """
+        if not isinstance(constraints, ConstraintsIndex):
+            constraints = ConstraintsIndex(constraints)
+        if not included:
+            return constraints
 
-        return depends
+        layered = self._layered_constraints.get(included)
+        if layered is None or layered[0] is not constraints:
+            index = ConstraintsIndex(*(self._load_constraints_file(path) for path in included), constraints)
+            layered = self._layered_constraints[included] = (constraints, index)
+        return layered[1]
 
-    def _parse_constraints_specifications(self, file_path: "list[str]") -> "dict[str, str]":
-        """Parses a constraints file and returns a dictionary of package constraints.
+    def _load_requirements_file(self, fp: Path) -> "Iterator[dict[str, str] | Include]":
+        """Load the entries of a requirements file, from the parse cache when it is up to date.
 
         Args:
-            file_path (list[str]): A list containing the path to the constraints file.
+            fp (Path): The requirements file.
+
+        Yields:
+            dict[str, str] | Include: A dependency dictionary, before constraints are applied, or a `-r`/`-c` include.
+        """
+        if self._parse_cache is None:
+            yield from self._read_requirements_file(fp)
+            return
+
+        key = self._parse_cache.key(fp)
+        records = self._parse_cache.get(key)
+        if records is not None:
+            yield from (self._decode_entry(record) for record in records)
+            return
+
+        with self._parse_cache.writer(key) as write:
+            for entry in self._read_requirements_file(fp):
+                write(self._encode_entry(entry))
+                yield entry
+
+    def _load_requirements_files(self, file_paths: "list[Path]") -> "list[list[dict[str, str] | Include]]":
+        """Load the entries of several requirements files over the worker pool.
+
+        Files are looked up in the parse cache first; the others are parsed by the pool and cached.
+
+        Args:
+            file_paths (list[Path]): The requirements files.
 
         Returns:
-            dict[str, str]: A dictionary mapping package names to version constraints.
+            list[list[dict[str, str] | Include]]: The entries of each file, in the order of `file_paths`.
         """
-        if not file_path:
-            return {}
+        results: "list[Optional[list[dict[str, str] | Include]]]" = [None] * len(file_paths)
+        keys: "dict[int, str]" = {}
 
-        constraints: "dict[str, str]" = {}
-        fp = Path(file_path[0])
+        for i, fp in enumerate(file_paths):
+            if self._parse_cache is None:
+                continue
+            keys[i] = self._parse_cache.key(fp)
+            records = self._parse_cache.get(keys[i])
+            if records is not None:
+                results[i] = [self._decode_entry(record) for record in records]
+
+        misses = [i for i, entries in enumerate(results) if entries is None]
+        executor_cls = ProcessPoolExecutor if self._executor == "process" else ThreadPoolExecutor
+        with executor_cls(max_workers=min(self._jobs, len(misses) or 1)) as executor:
+            parsed = executor.map(_read_requirements_file, [file_paths[i] for i in misses])
+            for i, entries in zip(misses, parsed):
+                results[i] = entries
+                if self._parse_cache is not None:
+                    self._parse_cache.set(keys[i], (self._encode_entry(entry) for entry in entries))
+
+        return cast("list[list[dict[str, str] | Include]]", results)
+
+    @staticmethod
+    def _encode_entry(entry: "dict[str, str] | Include | LocalRequirement") -> "dict[str, Any]":
+        if isinstance(entry, Include):
+            return {"include": entry.kind.value, "path": str(entry.path)}
+        if isinstance(entry, LocalRequirement):
+            return {"local": entry.path, "editable": entry.editable, "extras": list(entry.extras), "name": entry.name}
+        return entry
+
+    @staticmethod
+    def _decode_entry(record: "dict[str, Any]") -> "dict[str, str] | Include | LocalRequirement":
+        if "include" in record:
+            return Include(LineKind(record["include"]), Path(record["path"]))
+        if "local" in record:
+            return LocalRequirement(record["local"], record["editable"], tuple(record["extras"]), record.get("name"))
+        return record
+
+    def _read_requirements_file(self, fp: Path) -> "Iterator[dict[str, str] | Include | LocalRequirement]":
+        """Parse the entries of a requirements file, one line at a time.
+
+        Local projects are kept as `LocalRequirement` entries, their package name is looked up when the
+        file is walked, so cached entries never go stale when a local project is renamed.
 
-        if not fp.is_file():
-            raise FileNotFoundError(f"unable to locate the constraints file: {fp}")
+        Args:
+            fp (Path): The requirements file.
 
-        with fp.open() as file:
-            for line in file:
-                if line.strip() and not line.strip()[0].isalpha():
+        Yields:
+            dict[str, str] | Include | LocalRequirement: A dependency dictionary, before constraints are applied,
+                a `-r`/`-c` include, or a local project.
+        """
+        with fp.open() as f:
+            entries, requirements = itertools.tee(self._iter_requirement_lines(f))
+            # a single `==` or `~=` clause is kept as written
+            specifications = parse_many(
+                (r.value for r in requirements if self._is_package_requirement(r)), keep_operators=True
+            )
+
+            for requirement in entries:
+                if requirement.kind in (LineKind.REQUIREMENTS_FILE, LineKind.CONSTRAINTS_FILE):
+                    yield Include.from_line(requirement, fp)
+                    continue
+
+                if not self._is_package_requirement(requirement):
+                    yield LocalRequirement.from_line(requirement)
                     continue
-                dep = cast("dict[str, str]", parse_dependency_specification(line))
-                constraints[dep["name"]] = dep["version"]
 
-        return constraints
+                deps = cast("dict[str, str]", next(specifications))
+
+                if self.is_empty(deps):
+                    continue
+
+                yield deps
+
+    def _iter_requirement_lines(self, lines: "Iterable[str]") -> "Iterator[RequirementLine]":
+        """Yield the requirements, local projects and `-r`/`-c` includes of a requirements file, skipping other lines.
 
-    def update_pyproject_toml(self, groups_specs: "dict[str, list[dict[str, str]]]"):
+        Args:
+            lines (Iterable[str]): The physical lines of the file.
+
+        Yields:
+            RequirementLine: A requirement, a local project, or an include.
+        """
+        for requirement in tokenize_requirements(lines):
+            if requirement.kind in (LineKind.REQUIREMENTS_FILE, LineKind.CONSTRAINTS_FILE):
+                yield requirement
+            elif requirement.kind is LineKind.EDITABLE and is_local_requirement(requirement.value):
+                yield requirement
+            elif requirement.kind is LineKind.REQUIREMENT and (
+                requirement.value[0].isalpha() or is_local_requirement(requirement.value)
+            ):
+                yield requirement
+
+    @staticmethod
+    def _is_package_requirement(requirement: RequirementLine) -> bool:
+        # a requirement on a package name or URL, rather than a local project or an include
+        return requirement.kind is LineKind.REQUIREMENT and not is_local_requirement(requirement.value)
+
+    def _inspect_local_packages(self, requirements: "Iterable[LocalRequirement]") -> None:
+        """Find the package names of local projects, from the metadata cache or by inspecting them.
+
+        Inspecting a project may build it through its PEP 517 backend, so the projects that are not cached
+        yet are inspected in parallel.
+
+        Args:
+            requirements (Iterable[LocalRequirement]): The local projects.
+
+        Raises:
+            FileNotFoundError: If a local project does not exist.
+        """
+        misses: "list[tuple[Path, Optional[str]]]" = []
+
+        cwd = self._working_dir()
+        for path in dict.fromkeys(requirement.resolve(cwd) for requirement in requirements if requirement.name is None):
+            if path in self._local_packages:
+                continue
+            if not path.exists():
+                raise FileNotFoundError(f"unable to locate the local project: {path}")
+
+            key = self._metadata_cache.key(path) if self._metadata_cache is not None else None
+            records = self._metadata_cache.get(key) if self._metadata_cache is not None and key else None
+            if records:
+                self._local_packages[path] = records[0]["name"]
+            else:
+                misses.append((path, key))
+
+        if not misses:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(len(misses), LOCAL_INSPECT_WORKERS)) as executor:
+            inspected = executor.map(_inspect_local_package, [path for path, _ in misses])
+            for (path, key), metadata in zip(misses, inspected):
+                self._local_packages[path] = metadata["name"]
+                if self._metadata_cache is not None and key:
+                    self._metadata_cache.set(key, [metadata])
+
+    def _local_dependency(self, requirement: LocalRequirement) -> "dict[str, Any]":
+        """Build the dependency dictionary of a local project, e.g. `{"name": "core", "path": "./libs/core"}`.
+
+        Poetry reads the path relative to the pyproject.toml, while the requirements file gives it relative to
+        the working directory, so a relative path is rewritten against the directory of the pyproject.toml.
+
+        Args:
+            requirement (LocalRequirement): The local project.
+
+        Returns:
+            dict[str, Any]: The dependency, with `develop` set for editable projects.
+        """
+        path = requirement.resolve(self._working_dir())
+        if requirement.name is None and path not in self._local_packages:
+            self._inspect_local_packages([requirement])
+
+        name = requirement.name or self._local_packages[path]
+        dependency: "dict[str, Any]" = {"name": name, "path": self._pyproject_relative(path)}
+        if requirement.extras:
+            dependency["extras"] = list(requirement.extras)
+        if requirement.editable:
+            dependency["develop"] = True
+        return dependency
+
+    def _pyproject_relative(self, path: Path) -> str:
+        """The POSIX path of `path` relative to the directory of the pyproject.toml, e.g. `../libs/core`.
+
+        The absolute path when there is no relative one, e.g. on another drive on Windows.
+        """
+        try:
+            relative = Path(os.path.relpath(path, self._pyproject_path().resolve().parent)).as_posix()
+        except ValueError:
+            return path.as_posix()
+        return relative if relative.startswith(".") else f"./{relative}"
+
+    def _parse_constraints_specifications(self, file_path: "list[str]") -> ConstraintsIndex:
+        """Parses the constraints files given on the command line into a single index.
+
+        Args:
+            file_path (list[str]): The paths to the constraints files, a later file overriding an earlier one.
+
+        Returns:
+            ConstraintsIndex: The version constraints by canonical package name.
+        """
+        for fp in map(Path, file_path):
+            if not fp.is_file():
+                raise FileNotFoundError(f"unable to locate the constraints file: {fp}")
+
+        return ConstraintsIndex(*(self._load_constraints_file(Path(fp)) for fp in file_path))
+
+    def _load_constraints_file(self, fp: Path) -> ConstraintsIndex:
+        """Parse a constraints file once per run, whether given with `-c` or included by a requirements file.
+
+        Args:
+            fp (Path): The constraints file.
+
+        Returns:
+            ConstraintsIndex: The version constraints by canonical package name, shared between callers.
+        """
+        key = fp.resolve()
+        if key in self._constraints_files:
+            return self._constraints_files[key]
+
+        if not key.is_file():
+            raise FileNotFoundError(f"unable to locate the constraints file: {fp}")
+
+        constraints: "dict[str, str]" = {}
+
+        with key.open() as file:
+            lines = (
+                requirement.value
+                for requirement in tokenize_requirements(file)
+                if requirement.kind is LineKind.REQUIREMENT and requirement.value[0].isalpha()
+            )
+            for dep in parse_many(lines):
+                if dep.get("name") and dep.get("version"):
+                    constraints[dep["name"]] = dep["version"]
+
+        index = self._constraints_files[key] = ConstraintsIndex(constraints)
+        return index
+
+    def update_pyproject_toml(self, groups_specs: "dict[str, list[dict[str, str]]]") -> bool:
         """Update the pyproject.toml file with new dependency specifications.
 
+        With `--dry-run` or `--diff`, the update is made to the document in memory only, and printed.
+
         Args:
             groups_specs (dict[str, list[dict[str, str]]]): A dictionary mapping group names to lists of dependencies.
+
+        Returns:
+            bool: Whether the content of pyproject.toml changed, or would change when previewing.
         """
         verbose = self.option("verbose")
 
         if verbose:
             self.line(f"DEBUG: update_pyproject_toml called with: {groups_specs}", style="debug")
 
-        pyproject_path = Path(os.getenv("PYPROJECT_CUSTOM_PATH", "pyproject.toml"))
+        pyproject_path = self._pyproject_path()
         if verbose:
             self.line(f"DEBUG: pyproject_path: {pyproject_path}, exists: {pyproject_path.is_file()}", style="debug")
 
         if not pyproject_path.is_file():
             raise FileNotFoundError("pyproject.toml not found")
 
-        data = parse(pyproject_path.read_text())
+        original = pyproject_path.read_bytes()
+        data = parse(original.decode("utf-8"))
 
         # Detect or use specified Poetry version
         poetry_version = detect_poetry_version(data, self.option("poetry-version"))
 
         no_versions: "list[str]" = []
+        conflicts: "list[str]" = []
+        # Every dependency already declared, kept current as the import adds to it
+        index = DependencyIndex.from_document(data, poetry_version)
+        before = index.copy()
 
         if poetry_version == PoetryVersion.V1:
             # Poetry v1 format (tool.poetry section)
-            self._update_poetry_v1_format(data, groups_specs, no_versions)
+            self._update_poetry_v1_format(data, groups_specs, no_versions, index, conflicts)
         else:
             # Poetry v2 format (project section)
-            self._update_poetry_v2_format(data, groups_specs, no_versions)
+            self._update_poetry_v2_format(data, groups_specs, no_versions, index, conflicts)
+
+        for conflict in conflicts:
+            self._notice(conflict)
 
         if no_versions:
             no_versions_str = " ".join(no_versions)
-            self.line(
+            self._notice(
                 "one or more package(s) doesn't include version, "
                 f"please run `poetry add {no_versions_str}` seperately. "
                 "Skipping them for import.",
@@ -482,25 +1167,86 @@ class ImportReqCommand(Command):
         # If the file was originally v1 format but we're using v2 format,
         # add a message about the conversion
         if poetry_version == PoetryVersion.V2 and "project" in data and data["project"].get("dependencies", "") == "":  # type: ignore
-            self.line(
+            self._notice(
                 "Converting from Poetry v1 to v2 format. The tool.poetry section will be kept for compatibility.",
                 style="info",
             )
 
-        # Write back the updated file
-        toml_content = dumps(data)
+        changes = before.diff(index)
+        self._changed_dependencies = {}
+        for kind in ("added", "changed"):
+            for group, names in changes.get(kind, {}).items():
+                self._changed_dependencies.setdefault(group, []).extend(names)
+        self._removed_dependencies = {group: list(names) for group, names in changes.get("removed", {}).items()}
+        if self._sync_groups and not self._previewing():
+            self._print_sync_report(changes)
+
+        content = dumps(data)
+        if self._previewing():
+            changed = content.encode("utf-8") != original
+            if self.option("diff"):
+                self._print_diff(pyproject_path, original.decode("utf-8"), content)
+            if self.option("dry-run"):
+                self._print_change_set(pyproject_path, changed, changes)
+            return changed
+
+        # Write back the updated file, leaving it untouched if the import changed nothing
+        written = write_if_changed(pyproject_path, content, original)
+        if verbose and not written:
+            self.line(f"DEBUG: {pyproject_path} is up to date, not writing it", style="debug")
+        return written
+
+    def _print_diff(self, pyproject_path: Path, original: str, content: str) -> None:
+        """Print the changes to pyproject.toml as a unified diff, nothing if there are none."""
+        # `a/` and `b/` prefixes for a relative path, as git does, so the diff applies with `patch -p1`
+        prefixes = ("", "") if pyproject_path.is_absolute() else ("a/", "b/")
+        diff = difflib.unified_diff(
+            original.splitlines(keepends=True),
+            content.splitlines(keepends=True),
+            fromfile=f"{prefixes[0]}{pyproject_path}",
+            tofile=f"{prefixes[1]}{pyproject_path}",
+        )
+        # raw, so that e.g. `<3.0` is not taken for a style tag
+        self._io.write("".join(diff), type=OutputType.RAW)
+
+    def _print_sync_report(self, changes: "dict[str, dict[str, dict[str, Any]]]") -> None:
+        """Print the edits `--sync` made to each group, see `DependencyIndex.diff`."""
+        if not changes:
+            self.line("The dependencies already match the requirements files.", style="info")
+            return
 
-        # Fix group formatting - this is a workaround for tomlkit formatting issues
-        for group_name in [g for g, _ in groups_specs.items() if g != "root"]:
-            # Fix formatting for both v1 and v2
-            toml_content = toml_content.replace(
-                f'"group.{group_name}.dependencies"', f"group.{group_name}.dependencies"
-            )
+        def describe(name: str, constraint: str) -> str:
+            return Formatter.escape(f"{name} ({constraint})" if constraint else name)
+
+        for group in sorted({group for groups in changes.values() for group in groups}):
+            self.line(f"Synced group '{group}':", style="info")
+            for name, constraint in changes.get("added", {}).get(group, {}).items():
+                self.line(f"  + {describe(name, constraint)}")
+            for name, constraints in changes.get("changed", {}).get(group, {}).items():
+                self.line(f"  ~ {describe(name, constraints['from'])} -> {Formatter.escape(constraints['to'] or '*')}")
+            for name, constraint in changes.get("removed", {}).get(group, {}).items():
+                self.line(f"  - {describe(name, constraint)}")
 
-        Path(pyproject_path).write_text(toml_content)
+    def _print_change_set(
+        self, pyproject_path: Path, changed: bool, dependencies: "dict[str, dict[str, dict[str, Any]]]"
+    ) -> None:
+        """Print the changes to pyproject.toml as JSON.
+
+        Args:
+            pyproject_path (Path): The pyproject.toml file.
+            changed (bool): Whether its content changes, formatting included.
+            dependencies: The dependencies added or changed, by kind and group, see `DependencyIndex.diff`.
+        """
+        change_set = {"pyproject": str(pyproject_path), "changed": changed, "dependencies": dependencies}
+        self._io.write_line(json.dumps(change_set, indent=2), type=OutputType.RAW)
 
     def _update_poetry_v1_format(
-        self, data: Any, groups_specs: "dict[str, list[dict[str, str]]]", no_versions: "list[str]"
+        self,
+        data: Any,
+        groups_specs: "dict[str, list[dict[str, str]]]",
+        no_versions: "list[str]",
+        index: DependencyIndex,
+        conflicts: "list[str]",
     ):
         """Update pyproject.toml in Poetry v1 format (tool.poetry section).
 
@@ -508,32 +1254,30 @@ class ImportReqCommand(Command):
             data: The parsed pyproject.toml content
             groups_specs: A dictionary mapping group names to lists of dependencies
             no_versions: A list to collect package names without versions
+            index: The dependencies already declared in the document
+            conflicts: A list to collect cross-group version conflicts
         """
-        # Ensure the tool.poetry section exists
-        if "tool" not in data:
-            data["tool"] = {}
-        if "poetry" not in data["tool"]:
-            data["tool"]["poetry"] = {}
-
-        poetry_section = cast("dict[str, Any]", data["tool"]["poetry"])
-
         for group, dependencies in groups_specs.items():
             # Ensure that the specific group section exists
-            if group != "root":
-                if group in poetry_section.get("group", {}):
-                    group_deps_table = poetry_section["group"][group]["dependencies"]
-                else:
-                    group_dependencies_key = f"group.{group}.dependencies"
-                    group_deps_table = poetry_section.setdefault(group_dependencies_key, table())
+            if group != ROOT_GROUP:
+                group_deps_table = group_dependencies_table(data, group)
             else:
-                if "dependencies" not in poetry_section:
-                    poetry_section["dependencies"] = table()
-                group_deps_table = poetry_section["dependencies"]
+                tool_section = data.setdefault("tool", table(is_super_table=True))
+                poetry_section = tool_section.setdefault("poetry", table())
+                group_deps_table = poetry_section.setdefault("dependencies", table())
 
-            self._add_dependencies_to_table(group_deps_table, dependencies, no_versions)
+            if group in self._sync_groups:
+                self._sync_table(group_deps_table, dependencies, index, group)
+            self._add_dependencies_to_table(group_deps_table, dependencies, no_versions, index, group, conflicts)
+            end_table(data, group_deps_table)
 
     def _update_poetry_v2_format(
-        self, data: Any, groups_specs: "dict[str, list[dict[str, str]]]", no_versions: "list[str]"
+        self,
+        data: Any,
+        groups_specs: "dict[str, list[dict[str, str]]]",
+        no_versions: "list[str]",
+        index: DependencyIndex,
+        conflicts: "list[str]",
     ):
         """Update pyproject.toml in Poetry v2 format (project section).
 
@@ -541,6 +1285,8 @@ class ImportReqCommand(Command):
             data: The parsed pyproject.toml content
             groups_specs: A dictionary mapping group names to lists of dependencies
             no_versions: A list to collect package names without versions
+            index: The dependencies already declared in the document
+            conflicts: A list to collect cross-group version conflicts
         """
         # Ensure the project section exists
         if "project" not in data:
@@ -558,30 +1304,118 @@ class ImportReqCommand(Command):
 
             # Project dependencies are stored as an array of strings in v2
             root_deps = groups_specs.get("root", [])
-            self._add_dependencies_to_project(project_section["dependencies"], root_deps, no_versions)
+            if ROOT_GROUP in self._sync_groups:
+                self._sync_project(data, project_section["dependencies"], root_deps, index)
+            added = self._add_dependencies_to_project(
+                project_section["dependencies"], root_deps, no_versions, index, conflicts
+            )
+
+            local_deps = [dep for dep in added if dep.get("path")]
+            if local_deps:
+                # Poetry 2 reads the source of a project dependency from tool.poetry.dependencies
+                tool_section = data.setdefault("tool", table(is_super_table=True))
+                poetry_section = tool_section.setdefault("poetry", table())
+                poetry_deps_table = poetry_section.setdefault("dependencies", table())
+                for dependency in local_deps:
+                    poetry_deps_table[dependency["name"]] = self._dependency_item(dependency)
+                end_table(data, poetry_deps_table)
 
         # Handle group dependencies (still using tool.poetry.group format)
-        non_root_groups = {k: v for k, v in groups_specs.items() if k != "root"}
-        if non_root_groups:
-            # Ensure tool.poetry section exists for groups
-            if "tool" not in data:
-                data["tool"] = {}
-            if "poetry" not in data["tool"]:
-                data["tool"]["poetry"] = {}
-
-            poetry_section = data["tool"]["poetry"]
-
-            for group, dependencies in non_root_groups.items():
-                if group in poetry_section.get("group", {}):
-                    group_deps_table = poetry_section["group"][group]["dependencies"]
-                else:
-                    group_dependencies_key = f"group.{group}.dependencies"
-                    group_deps_table = poetry_section.setdefault(group_dependencies_key, table())
+        for group, dependencies in groups_specs.items():
+            if group != ROOT_GROUP:
+                group_deps_table = group_dependencies_table(data, group)
+                if group in self._sync_groups:
+                    self._sync_table(group_deps_table, dependencies, index, group)
+                self._add_dependencies_to_table(group_deps_table, dependencies, no_versions, index, group, conflicts)
+                end_table(data, group_deps_table)
+
+    def _sync_table(
+        self, deps_table: Any, dependencies: "list[dict[str, str]]", index: DependencyIndex, group: str
+    ) -> None:
+        """Make a table section match the dependencies of its group, besides the ones to add.
+
+        Entries whose version specifier differs from the requirements files get the new one, and entries
+        no longer listed there are removed. The spelling of the names and the other keys of inline tables
+        are kept.
 
-                self._add_dependencies_to_table(group_deps_table, dependencies, no_versions)
+        Args:
+            deps_table: The table to sync
+            dependencies: List of dependency specifications
+            index: The dependencies already declared, updated with the edits
+            group: The group the table belongs to
+        """
+        wanted = {canonicalize_name(dep["name"]): dep for dep in dependencies if dep.get("name")}
+        for name in list(deps_table):
+            if name == "python":
+                continue
+            dependency = wanted.get(canonicalize_name(name))
+            if dependency is None:
+                del deps_table[name]
+                index.remove(group, name)
+                continue
+
+            version = dependency.get("version")
+            if not index.differs(group, name, version):
+                continue
+            if isinstance(deps_table[name], Mapping):
+                deps_table[name]["version"] = version
+            else:
+                deps_table[name] = self._dependency_item({**dependency, "name": name})
+            index.add(group, name, version)
+
+    def _sync_project(
+        self, data: Any, deps_array: Any, dependencies: "list[dict[str, str]]", index: DependencyIndex
+    ) -> None:
+        """Make the project.dependencies array match the root dependencies, besides the ones to add.
+
+        Entries whose version specifier differs from the requirements files are rewritten in place, and
+        entries no longer listed there are removed, along with their source in tool.poetry.dependencies.
+
+        Args:
+            data: The parsed pyproject.toml content
+            deps_array: The array to sync
+            dependencies: List of dependency specifications
+            index: The dependencies already declared, updated with the edits
+        """
+        wanted = {canonicalize_name(dep["name"]): dep for dep in dependencies if dep.get("name")}
+        removed: "list[int]" = []
+        removed_names: "set[str]" = set()
+        for position, entry in enumerate(deps_array):
+            parsed = parse_pep508(str(entry))
+            if parsed is None:
+                continue
+            name = parsed[0]
+            dependency = wanted.get(canonicalize_name(name))
+            if dependency is None:
+                removed.append(position)
+                removed_names.add(canonicalize_name(name))
+                index.remove(ROOT_GROUP, name)
+                continue
+
+            version = dependency.get("version")
+            processed = self._process_version(version) if version else None
+            if not index.differs(ROOT_GROUP, name, processed):
+                continue
+            deps_array[position] = self._project_entry({**dependency, "name": name})
+            index.add(ROOT_GROUP, name, processed)
+
+        # from the end, so that the positions left to remove stay valid
+        for position in reversed(removed):
+            del deps_array[position]
+
+        poetry_deps_table = data.get("tool", {}).get("poetry", {}).get("dependencies", {})
+        for name in list(poetry_deps_table):
+            if name != "python" and canonicalize_name(name) in removed_names:
+                del poetry_deps_table[name]
 
     def _add_dependencies_to_table(
-        self, deps_table: Any, dependencies: "list[dict[str, str]]", no_versions: "list[str]"
+        self,
+        deps_table: Any,
+        dependencies: "list[dict[str, str]]",
+        no_versions: "list[str]",
+        index: DependencyIndex,
+        group: str,
+        conflicts: "list[str]",
     ):
         """Add dependencies to a table section of the pyproject.toml.
 
@@ -589,150 +1423,152 @@ class ImportReqCommand(Command):
             deps_table: The table to add dependencies to
             dependencies: List of dependency specifications
             no_versions: List to collect package names without versions
+            index: The dependencies already declared, updated with the ones added
+            group: The group the table belongs to
+            conflicts: List to collect cross-group version conflicts
         """
-        # Get existing package names
-        existing_packages = set()
-        for key in deps_table:
-            # Normalize package name
-            normalized_key = key.lower().replace("-", "_").replace(".", "_")
-            existing_packages.add(normalized_key)
-
         for dependency in dependencies:
             name = dependency.get("name")
-            if not name:
+            # Skip if already in the group, whatever the spelling of the name
+            if not name or index.contains(group, name):
                 continue
 
-            # Normalize the current package name for comparison
-            normalized_name = name.lower().replace("-", "_").replace(".", "_")
-            # Skip if already in dependencies
-            if normalized_name in existing_packages:
+            dep_item = self._dependency_item(dependency)
+            if dep_item is None:
+                no_versions.append(name)
                 continue
 
-            version = dependency.get("version")
-            extras = dependency.get("extras")
-            markers = dependency.get("markers")
-            url = dependency.get("url")
-            git = dependency.get("git")
-
-            # Handle different dependency formats
-            if extras or markers or len(dependency) > 2:  # More than 'name' and 'version'
-                dep_dict = inline_table()
-                if version:
-                    dep_dict["version"] = version
-                if extras:
-                    dep_dict["extras"] = extras
-                if markers:
-                    dep_dict["markers"] = markers.replace('"', "'")
-                if git:
-                    dep_dict["git"] = git
-                    if dependency.get("rev"):
-                        dep_dict["rev"] = dependency["rev"]
-                if url:
-                    dep_dict["url"] = url
-                deps_table[name] = dep_dict
-                continue
+            self._check_conflicts(index, group, name, dependency.get("version"), conflicts)
+            deps_table[name] = dep_item
+            index.add(group, name, dependency.get("version"))
+
+    def _dependency_item(self, dependency: "dict[str, Any]") -> Any:
+        """Build the tool.poetry value of a dependency.
+
+        Args:
+            dependency: The dependency specification
 
+        Returns:
+            The version string or inline table, None if the dependency has nothing to pin it.
+        """
+        version = dependency.get("version")
+        extras = dependency.get("extras")
+        markers = dependency.get("markers")
+        url = dependency.get("url")
+        git = dependency.get("git")
+        path = dependency.get("path")
+
+        # Handle different dependency formats
+        if extras or markers or path or len(dependency) > 2:  # More than 'name' and 'version'
+            dep_dict = inline_table()
+            if version:
+                dep_dict["version"] = version
+            if extras:
+                dep_dict["extras"] = extras
+            if markers:
+                dep_dict["markers"] = markers.replace('"', "'")
+            if git:
+                dep_dict["git"] = git
+                if dependency.get("rev"):
+                    dep_dict["rev"] = dependency["rev"]
             if url:
-                dep_dict = inline_table()
                 dep_dict["url"] = url
-                deps_table[name] = dep_dict
-                continue
+            if path:
+                dep_dict["path"] = path
+                if dependency.get("develop"):
+                    dep_dict["develop"] = True
+            return dep_dict
 
-            if version:
-                deps_table[name] = item(version)
-                continue
+        if url:
+            dep_dict = inline_table()
+            dep_dict["url"] = url
+            return dep_dict
 
-            no_versions.append(name)
+        if version:
+            return item(version)
 
-    def _add_dependencies_to_project(
-        self, deps_array: Any, dependencies: "list[dict[str, str]]", no_versions: "list[str]"
+        return None
+
+    def _check_conflicts(
+        self, index: DependencyIndex, group: str, name: str, version: "Optional[str]", conflicts: "list[str]"
     ):
+        """Collect a warning if other groups already require `name` with a different version."""
+        others = index.conflicts(group, name, version)
+        if others:
+            declared = ", ".join(f"{constraint} in group '{other}'" for other, constraint in others.items())
+            conflicts.append(f"{name} is required as {version} in group '{group}' but {declared}")
+
+    def _add_dependencies_to_project(
+        self,
+        deps_array: Any,
+        dependencies: "list[dict[str, str]]",
+        no_versions: "list[str]",
+        index: DependencyIndex,
+        conflicts: "list[str]",
+    ) -> "list[dict[str, str]]":
         """Add dependencies to the project.dependencies array in Poetry v2 format.
 
         Args:
             deps_array: The array to add dependencies to
             dependencies: List of dependency specifications
             no_versions: List to collect package names without versions
+            index: The dependencies already declared, updated with the ones added
+            conflicts: List to collect cross-group version conflicts
+
+        Returns:
+            list[dict[str, str]]: The dependencies added to the array.
         """
-        # Get existing package names to avoid duplicates
-        existing_packages = set()
-        # standard library
-        import re
-
-        # pypi library
-        # First convert deps_array to a list if it's not already
-        from tomlkit.items import Array
-
-        if isinstance(deps_array, Array):
-            # Create a new list from the Array
-            existing_deps = list(deps_array)
-            # Clear the existing Array
-            while len(deps_array) > 0:
-                deps_array.pop()
-        else:
-            # This is already a list
-            existing_deps = deps_array
-
-        for entry in existing_deps:
-            # Extract package name from "package (version)" format
-            match = re.match(r'"?([a-zA-Z0-9_.-]+)["\s].*', str(entry))
-            if match:
-                # Normalize package name by converting to lowercase and replacing separators
-                pkg_name = match.group(1).lower()
-                pkg_name = pkg_name.replace("-", "_").replace(".", "_")
-                existing_packages.add(pkg_name)
-                # Add back to the deps_array
-                deps_array.append(entry)
+        added: "list[dict[str, str]]" = []
+        # Existing entries stay as they are, new ones are appended in one go
+        entries: "list[str]" = []
 
         for dependency in dependencies:
             name = dependency.get("name")
-            if not name:
+            # Skip if this package is already in the dependencies, whatever the spelling of the name
+            if not name or index.contains(ROOT_GROUP, name):
                 continue
 
-            # Normalize the current package name for comparison
-            normalized_name = name.lower().replace("-", "_").replace(".", "_")
-
-            # Skip if this package is already in the dependencies
-            if normalized_name in existing_packages:
+            entry = self._project_entry(dependency)
+            if entry is None:
+                no_versions.append(name)
                 continue
 
             version = dependency.get("version")
-            extras = dependency.get("extras")
-            markers = dependency.get("markers")
-            url = dependency.get("url")
-            git = dependency.get("git")
+            self._check_conflicts(index, ROOT_GROUP, name, version, conflicts)
+            entries.append(entry)
+            # as written to the array, so that a later --sync compares like with like
+            index.add(ROOT_GROUP, name, self._process_version(version) if version else None)
+            added.append(dependency)
 
-            # Format according to Poetry v2 spec
-            if not version:
-                no_versions.append(name)
-                continue
+        extend_array(deps_array, entries)
+        return added
 
-            # Simple version constraint
-            if not (extras or markers or url or git):
-                processed_version = self._process_version(version)
-                deps_array.append(f"{name} ({processed_version})")
-                continue
+    def _project_entry(self, dependency: "dict[str, Any]") -> "Optional[str]":
+        """Build the project.dependencies entry of a dependency.
 
-            # Complex dependency with extras
-            if extras:
-                extras_str = "[" + ",".join(extras) + "]"
-                if version:
-                    processed_version = self._process_version(version)
-                    deps_array.append(f"{name}{extras_str} ({processed_version})")
-                else:
-                    deps_array.append(f"{name}{extras_str}")
-                continue
-
-            # Complex dependency with other attributes
-            dep_str = name
-            if version:
-                processed_version = self._process_version(version)
-                dep_str += f" ({processed_version})"
-
-            if markers:
-                dep_str += f"; {markers}"
+        Args:
+            dependency: The dependency specification
 
-            deps_array.append(dep_str)
+        Returns:
+            The PEP 508 string, None if the dependency has nothing to pin it.
+        """
+        name = dependency["name"]
+        version = dependency.get("version")
+        extras = dependency.get("extras")
+        markers = dependency.get("markers")
+
+        # Local projects are listed by name, their path goes to tool.poetry.dependencies
+        if dependency.get("path"):
+            return name
+        # Format according to Poetry v2 spec
+        if not version:
+            return None
+        extras_str = "[" + ",".join(extras) + "]" if extras else ""
+        entry = f"{name}{extras_str} ({self._process_version(version)})"
+        # Environment markers apply whether or not there are extras
+        if markers:
+            entry += f"; {markers}"
+        return entry
 
     def _process_version(self, version):
         """Process a version string to avoid double operators."""
@@ -761,14 +1597,22 @@ class ImportReqCommand(Command):
         Run Poetry lock or install commands based on user input.
 
         Decides whether to run a Poetry update or install operation based on the options provided by the user.
+        Nothing is locked when the update added, changed or removed no dependency, and only the groups it
+        touched are installed. With `--sync`, only the changed packages are updated in the lock file. The
+        projects of a batch are locked in process, Poetry's own commands working on the directory it started in.
         """
         self.line("✨ Successfully import all the files!", style="success")
 
         if not (self.option("lock") or self.option("install")):
-            self.line(
-                "poetry.lock is not consistent with pyproject.toml. You may be getting improper dependencies. Run `poetry lock [--no-update]` to fix it",
-                style="warning",
-            )
+            if self._changed_dependencies or self._removed_dependencies:
+                self.line(
+                    "poetry.lock is not consistent with pyproject.toml. You may be getting improper dependencies. Run `poetry lock [--no-update]` to fix it",
+                    style="warning",
+                )
+            return
+
+        if not (self._changed_dependencies or self._removed_dependencies):
+            self.line("No dependency was added or changed, skipping the lock.", style="info")
             return
 
         lock_flags: tuple[str] | tuple[str, str]  # type: ignore
@@ -776,7 +1620,68 @@ class ImportReqCommand(Command):
         if self.option("no-update"):
             lock_flags = ("lock", "--no-update")
 
-        self.call(*lock_flags)
+        changed_names = [name for names in self._changed_dependencies.values() for name in names]
+        if self._sync_groups and changed_names:
+            # a targeted update: the other locked packages keep their versions, removed ones are dropped
+            lock_flags = ("update", f"--lock {' '.join(changed_names)}")
+        elif self._sync_groups and package_version("poetry").startswith("1."):
+            # only removals, which Poetry 1 would otherwise lock with every other package updated
+            lock_flags = ("lock", "--no-update")
+
+        # Poetry calls the group of the project dependencies "main"
+        groups = ["main" if group == ROOT_GROUP else group for group in self._changed_dependencies]
+
+        # nothing to install when the import only removed dependencies
+        if not (self.option("install") and groups) and self._project_dir is None:
+            self.call(*lock_flags)
+            return
+
+        try:
+            installer = poetry_installer(
+                self._io, self._pyproject_path().resolve().parent, disable_cache=self._no_cache()
+            )
+        except (ImportError, AttributeError) as e:
+            if self._project_dir is not None:
+                # Poetry's commands would lock the project of the directory Poetry was started from
+                raise CleoException(f"This Poetry version cannot lock several projects in one run: {e}") from e
+            # this Poetry version does not expose the installer the same way, run the commands instead
+            if self.option("verbose"):
+                self.line(f"DEBUG: Falling back to `poetry lock` and `poetry install`: {e}", style="debug")
+            self.call(*lock_flags)
+            self.call("install", f"--only {','.join(groups)}")
+            return
+
+        # Solve once, install, and write the lock file on success, like `poetry add` does. Locked versions
+        # are kept for the other packages, unless Poetry 1 was asked to update them too
+        keep_locked = (
+            self.option("no-update") or bool(self._sync_groups) or not package_version("poetry").startswith("1.")
+        )
+        if not (self.option("install") and groups):
+            # a project of a batch, locked like `poetry lock` does, or with --sync `poetry update --lock`
+            action = "Locking"
+            if self._sync_groups and changed_names:
+                # `lock()` would update every package, whitelist or not
+                installer.execute_operations(False)
+                installer.update(True)
+                installer.whitelist(changed_names)
+            else:
+                installer.lock(update=not keep_locked)
+        else:
+            action = "Installing"
+            installer.only_groups([canonicalize_name(group) for group in groups])
+            installer.update(True)
+            installer.whitelist(changed_names if keep_locked else [])
+        status = installer.run()
+        if status:
+            raise CleoException(f"{action} the dependencies failed with exit code {status}")
+
+
+def _read_requirements_file(fp: Path) -> "list[dict[str, str] | Include | LocalRequirement]":
+    """Parse the entries of a requirements file in a pool worker, which may be another process."""
+    return list(ImportReqCommand()._read_requirements_file(fp))
+
 
-        if self.option("install"):
-            self.call("install")
+def _inspect_local_package(path: Path) -> "dict[str, str]":
+    """Read the metadata of a local project in a pool worker, which may build it through its PEP 517 backend."""
+    specification = requirements_parser.get()(str(path))
+    return {"name": specification["name"]}
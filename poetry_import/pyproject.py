@@ -0,0 +1,353 @@
+"""
+Copyright 2024 Ben CHEN
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import annotations
+
+# standard library
+import os
+import re
+import stat
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Iterable, Iterator, Mapping, Optional
+
+# pypi library
+from tomlkit import nl, table
+from tomlkit.items import Array, Table, Whitespace
+
+# poetry-import library
+from poetry_import.backport import PoetryVersion, canonicalize_name, detect_poetry_version
+
+__all__ = [
+    "DependencyIndex",
+    "ROOT_GROUP",
+    "end_table",
+    "extend_array",
+    "group_dependencies_table",
+    "parse_pep508",
+    "write_if_changed",
+]
+
+
+ROOT_GROUP = "root"  # the main dependencies: project.dependencies and tool.poetry.dependencies
+# The name at the start of a PEP 508 string, e.g. `flask` in `flask[async] (>=2.0); python_version >= "3.8"`
+PEP508_NAME_RE = re.compile(r"^\s*([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)")
+PEP508_CONSTRAINT_RE = re.compile(r"^\s*[A-Za-z0-9._-]+\s*(?:\[[^\]]*\])?\s*\(?\s*([^;@)]*)")
+CONSTRAINT_NOISE_RE = re.compile(r"[\s()]")
+# The indentation of the first item of an array written one item per line
+ARRAY_INDENT_RE = re.compile(r"^\[[^\n]*\n([ \t]*)(?=[^\s\]])")
+ARRAY_TRAILING_COMMA_RE = re.compile(r",[ \t]*(?:#[^\n]*)?\n[ \t]*\]$")
+
+
+class DependencyIndex:
+    """Every dependency declared in a pyproject.toml, by PEP 503 canonical name and group.
+
+    Built once per update from `project.dependencies`, `project.optional-dependencies`,
+    `tool.poetry.dependencies` (see `from_document`), `tool.poetry.dev-dependencies` and every
+    `tool.poetry.group`, then kept current as dependencies are added, so checking whether a package is
+    already declared in a group, or declared differently in another one, is a dict lookup whatever the
+    size of the file.
+
+    Optional dependencies are indexed under `extra:<name>` groups.
+    """
+
+    def __init__(self) -> None:
+        # canonical name -> {group: normalized version constraint, "" when there is none}
+        self._groups: "dict[str, dict[str, str]]" = {}
+
+    @classmethod
+    def from_document(
+        cls, data: "Mapping[str, Any]", poetry_version: "Optional[PoetryVersion]" = None
+    ) -> "DependencyIndex":
+        """Index the dependencies of a parsed pyproject.toml.
+
+        In the v2 format, `project.dependencies` declares the root dependencies and the entries of
+        `tool.poetry.dependencies` only refine them, e.g. with the source of a local project, so they are
+        indexed as root dependencies only when the project does not declare its dependencies.
+
+        Args:
+            data (Mapping[str, Any]): The document, e.g. as parsed by tomlkit.
+            poetry_version (Optional[PoetryVersion]): The format the document is updated in, detected from
+                the document by default.
+
+        Returns:
+            DependencyIndex: The index.
+        """
+        index = cls()
+        project = data.get("project", {})
+        poetry = data.get("tool", {}).get("poetry", {})
+
+        index._add_pep508(ROOT_GROUP, project.get("dependencies", []))
+        for extra, dependencies in project.get("optional-dependencies", {}).items():
+            index._add_pep508(f"extra:{extra}", dependencies)
+
+        if (poetry_version or detect_poetry_version(data)) == PoetryVersion.V1 or "dependencies" not in project:
+            index._add_table(ROOT_GROUP, poetry.get("dependencies", {}))
+        index._add_table("dev", poetry.get("dev-dependencies", {}))
+        for group, section in poetry.get("group", {}).items():
+            index._add_table(group, section.get("dependencies", {}))
+
+        return index
+
+    def add(self, group: str, name: str, constraint: "Optional[str]" = None) -> None:
+        """Record that `group` declares `name`, e.g. `add("dev", "Django", "==3.0")`."""
+        groups = self._groups.setdefault(canonicalize_name(name), {})
+        normalized = _normalize_constraint(constraint)
+        if normalized or group not in groups:
+            groups[group] = normalized
+
+    def remove(self, group: str, name: str) -> None:
+        """Record that `group` no longer declares `name`."""
+        canonical = canonicalize_name(name)
+        groups = self._groups.get(canonical, {})
+        groups.pop(group, None)
+        if not groups:
+            self._groups.pop(canonical, None)
+
+    def contains(self, group: str, name: str) -> bool:
+        """Whether `group` already declares `name`, whatever the spelling of the name."""
+        return group in self._groups.get(canonicalize_name(name), ())
+
+    def differs(self, group: str, name: str, constraint: "Optional[str]") -> bool:
+        """Whether `group` declares `name` with another version constraint than `constraint`.
+
+        Args:
+            group (str): The group.
+            name (str): The package name.
+            constraint (Optional[str]): The wanted version constraint, e.g. `==1.0`.
+
+        Returns:
+            bool: False when `group` does not declare `name`, or without a constraint to compare.
+        """
+        normalized = _normalize_constraint(constraint)
+        groups = self._groups.get(canonicalize_name(name), {})
+        return bool(normalized) and group in groups and groups[group] != normalized
+
+    def groups(self, name: str) -> "dict[str, str]":
+        """The groups declaring `name`, with their version constraint ("" when there is none)."""
+        return dict(self._groups.get(canonicalize_name(name), {}))
+
+    def conflicts(self, group: str, name: str, constraint: "Optional[str]") -> "dict[str, str]":
+        """The other groups declaring `name` with a different version constraint than `constraint`.
+
+        Args:
+            group (str): The group `name` is being added to.
+            name (str): The package name.
+            constraint (Optional[str]): Its version constraint, e.g. `==1.0` or `>=2.0,<3`.
+
+        Returns:
+            dict[str, str]: The conflicting groups and their constraint; empty without a constraint to compare.
+        """
+        normalized = _normalize_constraint(constraint)
+        if not normalized:
+            return {}
+        return {
+            other: other_constraint
+            for other, other_constraint in self._groups.get(canonicalize_name(name), {}).items()
+            if other != group and other_constraint and other_constraint != normalized
+        }
+
+    def copy(self) -> "DependencyIndex":
+        """An independent copy of the index, e.g. to compare against once dependencies were added."""
+        index = DependencyIndex()
+        index._groups = {name: dict(groups) for name, groups in self._groups.items()}
+        return index
+
+    def diff(self, other: "DependencyIndex") -> "dict[str, dict[str, dict[str, Any]]]":
+        """The changes turning this index into `other`, by kind, group and canonical name.
+
+        Args:
+            other (DependencyIndex): The index after the changes.
+
+        Returns:
+            dict[str, dict[str, dict[str, Any]]]: The `added` and `removed` dependencies with their constraint,
+                and the `changed` ones with their constraint `from` and `to`. Kinds and groups without any change
+                are left out.
+        """
+        changes: "dict[str, dict[str, dict[str, Any]]]" = {}
+
+        def record(kind: str, group: str, name: str, value: Any) -> None:
+            changes.setdefault(kind, {}).setdefault(group, {})[name] = value
+
+        for name in sorted(self._groups.keys() | other._groups.keys()):
+            before, after = self._groups.get(name, {}), other._groups.get(name, {})
+            for group in sorted(before.keys() | after.keys()):
+                if group not in before:
+                    record("added", group, name, after[group])
+                elif group not in after:
+                    record("removed", group, name, before[group])
+                elif before[group] != after[group]:
+                    record("changed", group, name, {"from": before[group], "to": after[group]})
+        return changes
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and canonicalize_name(name) in self._groups
+
+    def __iter__(self) -> "Iterator[str]":
+        return iter(self._groups)
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def _add_pep508(self, group: str, dependencies: "Iterable[Any]") -> None:
+        for dependency in dependencies:
+            parsed = parse_pep508(str(dependency))
+            if parsed is not None:
+                self.add(group, *parsed)
+
+    def _add_table(self, group: str, table: "Mapping[str, Any]") -> None:
+        for name, value in table.items():
+            if name == "python":
+                continue
+            if isinstance(value, Mapping):
+                value = value.get("version")
+            self.add(group, name, str(value) if isinstance(value, str) else None)
+
+
+def parse_pep508(dependency: str) -> "Optional[tuple[str, Optional[str]]]":
+    """The name and version constraint of a PEP 508 string, e.g. `("flask", ">=2.0")` for `flask (>=2.0)`.
+
+    Args:
+        dependency (str): The dependency string, as found in `project.dependencies`.
+
+    Returns:
+        Optional[tuple[str, Optional[str]]]: None when the string does not start with a package name.
+    """
+    match = PEP508_NAME_RE.match(dependency)
+    if match is None:
+        return None
+    constraint = PEP508_CONSTRAINT_RE.match(dependency)
+    return match.group(1), constraint.group(1) if constraint else None
+
+
+def _normalize_constraint(constraint: "Optional[str]") -> str:
+    # `==1.0`, `1.0` and `(== 1.0)` are the same requirement for Poetry
+    if not constraint:
+        return ""
+    normalized = CONSTRAINT_NOISE_RE.sub("", constraint)
+    if normalized.startswith("==") and not normalized.startswith("==="):
+        normalized = normalized[2:]
+    return "" if normalized == "*" else normalized
+
+
+def extend_array(array: Array, values: "list[Any]") -> None:
+    """Append `values` to a tomlkit array, in the layout of its existing items.
+
+    `Array.append` reindexes the whole array, which makes adding n items to it quadratic; all the values
+    go in through a single `Array.add_line` instead. Existing items are left as they are: an inline array
+    stays inline, and one written an item per line gets the new items on their own lines, with the same
+    indentation and trailing comma.
+
+    Args:
+        array (Array): The array to extend in place.
+        values (list[Any]): The values to append.
+    """
+    if not values:
+        return
+
+    rendered = array.as_string()
+    if "\n" in rendered:
+        match = ARRAY_INDENT_RE.match(rendered)
+        separator = "\n" + (match.group(1) if match else "    ")
+        trailing_comma = len(array) == 0 or ARRAY_TRAILING_COMMA_RE.search(rendered) is not None
+    else:
+        separator, trailing_comma = " ", False
+
+    items: "list[Any]" = []
+    for value in values:
+        if items:
+            items += [Whitespace(","), Whitespace(separator)]
+        items.append(value)
+    if trailing_comma:
+        items.append(Whitespace(","))
+
+    indent = separator if len(array) or "\n" in separator else ""
+    array.add_line(*items, indent=indent, newline=False, add_comma=False)
+
+
+def group_dependencies_table(data: "Mapping[str, Any]", group: str) -> Table:
+    """The `tool.poetry.group.<group>.dependencies` table of a document, created if needed.
+
+    Missing parents are created as super tables, so the document serializes as a single
+    `[tool.poetry.group.<group>.dependencies]` header rather than one header per level.
+
+    Args:
+        data (Mapping[str, Any]): The document, as parsed by tomlkit.
+        group (str): The group name.
+
+    Returns:
+        Table: The dependencies table of the group.
+    """
+    section: Any = data
+    for key in ("tool", "poetry", "group", group):
+        if key not in section:
+            section[key] = table(is_super_table=True)
+        section = section[key]
+    if "dependencies" not in section:
+        section["dependencies"] = table()
+    return section["dependencies"]
+
+
+def end_table(data: "Mapping[str, Any]", tool_table: Table) -> None:
+    """Separate a `tool` table from the top-level table following it with a blank line.
+
+    Tables added to a document do not end with one, so a new table rendered ahead of e.g. `[build-system]`
+    would be glued to it.
+
+    Args:
+        data (Mapping[str, Any]): The document, as parsed by tomlkit.
+        tool_table (Table): A table under `tool`.
+    """
+    body = tool_table.value.body
+    if not body or isinstance(body[-1][1], Whitespace) or next(reversed(list(data)), None) == "tool":
+        return
+    tool_table.add(nl())
+
+
+def write_if_changed(path: Path, content: str, original: bytes) -> bool:
+    """Atomically replace `path` with `content`, unless that is what it already holds.
+
+    An unchanged file keeps its mtime, so Poetry, build caches and file watchers do not see a change.
+    Otherwise the content goes to a temporary file next to `path`, which then replaces it: a crash leaves
+    either the old or the new file, never a truncated one. The file keeps its permissions, and a symlink
+    is followed rather than replaced.
+
+    Args:
+        path (Path): The file to write.
+        content (str): Its new content.
+        original (bytes): Its content as read before the update.
+
+    Returns:
+        bool: Whether the file was written.
+    """
+    encoded = content.encode("utf-8")
+    if encoded == original:
+        return False
+
+    target = path.resolve()
+    mode = stat.S_IMODE(target.stat().st_mode)
+    f = NamedTemporaryFile("wb", dir=target.parent, prefix=f".{target.name}.", suffix=".tmp", delete=False)
+    try:
+        with f:
+            f.write(encoded)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(f.name, mode)
+        os.replace(f.name, target)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+    return True
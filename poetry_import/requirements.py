@@ -0,0 +1,405 @@
+"""
+Copyright 2024 Ben CHEN
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import annotations
+
+# standard library
+import os
+import re
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Mapping, NamedTuple, Optional
+
+# poetry-import library
+from poetry_import.backport import CleoException, canonicalize_name
+
+__all__ = [
+    "LineKind",
+    "RequirementLine",
+    "Include",
+    "LocalRequirement",
+    "ConstraintsIndex",
+    "RequirementsGraph",
+    "is_local_requirement",
+    "join_lines",
+    "tokenize_requirements",
+]
+
+
+# Same rule as pip: a comment starts at a `#` at the beginning of the line or after whitespace
+COMMENT_RE = re.compile(r"(^|\s+)#.*$")
+# The options part of a line starts at the first whitespace-separated token beginning with a dash
+OPTIONS_RE = re.compile(r"(?:^|\s)(?=-)")
+OPTION_TOKEN_RE = re.compile(r"(--?[\w-]+)(?:[=\s]\s*([^\s]+))?")
+# Like pip: `.`, `..`, or a path starting with `./`, `../`, `/`, `~/` or a drive letter
+LOCAL_PATH_RE = re.compile(r"^(?:\.{1,2}|~)?[/\\]|^\.{1,2}(?:\[|$)|^[A-Za-z]:[/\\]")
+LOCAL_EXTRAS_RE = re.compile(r"^(?P<path>.+?)\[(?P<extras>[^\]]*)\]$")
+# A PEP 508 direct reference to a local path, e.g. `core[dev] @ ./libs/core`
+LOCAL_REFERENCE_RE = re.compile(
+    r"^(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[(?P<extras>[^\]]*)\])?\s*@\s*"
+    r"(?P<path>\.{1,2}|(?:\.{1,2}|~)?[/\\]\S*|[A-Za-z]:[/\\]\S*)\s*$"
+)
+
+
+class LineKind(Enum):
+    REQUIREMENT = "requirement"  # e.g. requests==2.31.0
+    EDITABLE = "editable"  # -e ./libs/core
+    REQUIREMENTS_FILE = "requirements"  # -r base.txt
+    CONSTRAINTS_FILE = "constraints"  # -c constraints.txt
+    OPTION = "option"  # global options, e.g. --index-url
+
+
+class RequirementLine(NamedTuple):
+    """A logical line of a requirements file.
+
+    Attributes:
+        kind (LineKind): What the line declares.
+        value (str): The requirement specification, or the argument of the option.
+        lineno (int): The physical line the logical line starts at, 1-based.
+        hashes (tuple[str, ...]): The `--hash` values of the requirement.
+        options (tuple[tuple[str, str], ...]): The other per-requirement options, e.g. `--config-settings`.
+    """
+
+    kind: LineKind
+    value: str
+    lineno: int
+    hashes: "tuple[str, ...]" = ()
+    options: "tuple[tuple[str, str], ...]" = ()
+
+
+_FILE_OPTIONS = {
+    "-e": LineKind.EDITABLE,
+    "--editable": LineKind.EDITABLE,
+    "-r": LineKind.REQUIREMENTS_FILE,
+    "--requirement": LineKind.REQUIREMENTS_FILE,
+    "-c": LineKind.CONSTRAINTS_FILE,
+    "--constraint": LineKind.CONSTRAINTS_FILE,
+}
+
+
+def join_lines(lines: "Iterable[str]") -> "Iterator[tuple[int, str]]":
+    """Join `\\`-continued lines and strip comments, the way pip reads requirements files.
+
+    Args:
+        lines (Iterable[str]): The physical lines, e.g. an open file.
+
+    Yields:
+        tuple[int, str]: The 1-based number of the first physical line and the non-empty logical line.
+    """
+    parts: "list[str]" = []
+    start = 0
+
+    for lineno, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        is_comment = COMMENT_RE.match(line) is not None
+
+        if line.endswith("\\") and not is_comment:
+            if not parts:
+                start = lineno
+            parts.append(line[:-1])
+            continue
+
+        if parts:
+            # a comment line ends the continuation, like in pip
+            parts.append(" " + line if is_comment else line)
+            line, lineno = "".join(parts), start
+            parts = []
+
+        line = COMMENT_RE.sub("", line).strip()
+        if line:
+            yield lineno, line
+
+    if parts:
+        line = COMMENT_RE.sub("", "".join(parts)).strip()
+        if line:
+            yield start, line
+
+
+def tokenize_requirements(lines: "Iterable[str]") -> "Iterator[RequirementLine]":
+    """Split the logical lines of a requirements file into requirements and options.
+
+    Continuations are joined, comments dropped, and per-requirement options such as `--hash` and
+    `--config-settings` are collected apart from the requirement, so the parser only ever sees a clean
+    specification, once per logical requirement.
+
+    Args:
+        lines (Iterable[str]): The physical lines, e.g. an open file.
+
+    Yields:
+        RequirementLine: One entry per logical line.
+    """
+    for lineno, line in join_lines(lines):
+        if line.startswith("-"):
+            option, _, value = line.partition(" ")
+            if "=" in option and not value:
+                option, _, value = option.partition("=")
+            elif not value and option[:2] in _FILE_OPTIONS and len(option) > 2:
+                # short options glued to their argument, e.g. -rbase.txt
+                option, value = option[:2], option[2:]
+            kind = _FILE_OPTIONS.get(option, LineKind.OPTION)
+            yield RequirementLine(kind, value.strip() if kind is not LineKind.OPTION else line, lineno)
+            continue
+
+        match = OPTIONS_RE.search(line)
+        if match is None:
+            yield RequirementLine(LineKind.REQUIREMENT, line, lineno)
+            continue
+
+        spec, options_str = line[: match.start()].strip(), line[match.end() :]
+        hashes: "list[str]" = []
+        options: "list[tuple[str, str]]" = []
+        for name, value in OPTION_TOKEN_RE.findall(options_str):
+            if name == "--hash":
+                hashes.append(value)
+            else:
+                options.append((name.lstrip("-"), value))
+
+        yield RequirementLine(LineKind.REQUIREMENT, spec, lineno, tuple(hashes), tuple(options))
+
+
+class Include(NamedTuple):
+    """A `-r` or `-c` line, with its path resolved against the directory of the file it appears in.
+
+    Attributes:
+        kind (LineKind): Either `LineKind.REQUIREMENTS_FILE` or `LineKind.CONSTRAINTS_FILE`.
+        path (Path): The absolute path of the included file.
+    """
+
+    kind: LineKind
+    path: Path
+
+    @classmethod
+    def from_line(cls, line: RequirementLine, source: Path) -> "Include":
+        """Resolve the include found at `line` of the file `source`."""
+        path = Path(line.value).expanduser()
+        if not path.is_absolute():
+            path = source.parent / path
+        return cls(line.kind, path.resolve())
+
+
+def is_local_requirement(value: str) -> bool:
+    """Whether a requirement is a local project directory or archive rather than a package name.
+
+    Args:
+        value (str): The requirement, e.g. `./vendor/pkg`, `libs/core[dev]` or `requests>=2.0`.
+
+    Returns:
+        bool: True for paths and `name @ ./path` requirements, False for names, URLs and `name @ url` requirements.
+    """
+    if LOCAL_PATH_RE.match(value) or LOCAL_REFERENCE_RE.match(value):
+        return True
+    return ("/" in value or os.sep in value) and "://" not in value and "@" not in value
+
+
+class LocalRequirement(NamedTuple):
+    """A requirement on a local project, e.g. `./vendor/pkg`, `-e ./libs/core[dev]` or `core @ ./libs/core`.
+
+    Attributes:
+        path (str): The path as written; like pip, relative paths are relative to the working directory.
+        editable (bool): Whether the requirement comes from an `-e` line.
+        extras (tuple[str, ...]): The extras requested, e.g. `("dev",)`.
+        name (Optional[str]): The package name a `name @ path` requirement declares, None when it has to be
+            read from the project.
+    """
+
+    path: str
+    editable: bool = False
+    extras: "tuple[str, ...]" = ()
+    name: "Optional[str]" = None
+
+    @classmethod
+    def from_line(cls, line: RequirementLine) -> "LocalRequirement":
+        """Build the local requirement of a requirement or `-e` line."""
+        reference = LOCAL_REFERENCE_RE.match(line.value)
+        if reference is not None:
+            extras = tuple(extra.strip() for extra in (reference.group("extras") or "").split(",") if extra.strip())
+            return cls(reference.group("path"), line.kind is LineKind.EDITABLE, extras, reference.group("name"))
+        match = LOCAL_EXTRAS_RE.match(line.value)
+        if match is None:
+            return cls(line.value, line.kind is LineKind.EDITABLE)
+        extras = tuple(extra.strip() for extra in match.group("extras").split(",") if extra.strip())
+        return cls(match.group("path"), line.kind is LineKind.EDITABLE, extras)
+
+    def resolve(self, cwd: "Optional[Path]" = None) -> Path:
+        """Return the absolute path of the project.
+
+        Args:
+            cwd (Optional[Path]): The directory relative paths are resolved against, the working directory by default.
+        """
+        path = Path(self.path).expanduser()
+        if not path.is_absolute():
+            path = (cwd or Path.cwd()) / path
+        return path.resolve()
+
+
+class ConstraintsIndex(Mapping[str, str]):
+    """Version constraints by PEP 503 canonical package name, e.g. `Django` and `django` share one entry.
+
+    Layers are given from the lowest to the highest precedence, e.g. the constraints files of a command
+    line in order, and flattened once, so a lookup is a single dict access whatever the number of files,
+    and the index can be shared by every group of a run.
+    """
+
+    def __init__(self, *layers: "Mapping[str, str]"):
+        """
+        Args:
+            layers: Constraints by package name, a later layer overriding the versions of an earlier one.
+        """
+        self._constraints: "dict[str, str]" = {}
+        for layer in layers:
+            if isinstance(layer, ConstraintsIndex):
+                self._constraints.update(layer._constraints)
+            else:
+                self._constraints.update((canonicalize_name(name), version) for name, version in layer.items())
+
+    def __getitem__(self, name: str) -> str:
+        return self._constraints[canonicalize_name(name)]
+
+    def __iter__(self) -> "Iterator[str]":
+        return iter(self._constraints)
+
+    def __len__(self) -> int:
+        return len(self._constraints)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._constraints!r})"
+
+
+class RequirementsGraph:
+    """The graph of requirements files and the files they include through `-r` and `-c` lines.
+
+    Every physical file is loaded exactly once, whichever group or file includes it, and its entries
+    are then shared by reference. Walking the graph detects include cycles.
+
+    Attributes:
+        files (dict[Path, list[Any]]): The entries of every file loaded so far, by resolved path.
+    """
+
+    def __init__(self, load: "Callable[[Path], Iterable[Any]]"):
+        """
+        Args:
+            load: Loads the entries of a file: its dependencies, with `Include` entries for `-r`/`-c` lines.
+        """
+        self._load = load
+        self.files: "dict[Path, list[Any]]" = {}
+
+    def entries(self, path: Path) -> "list[Any]":
+        """Return the entries of a file, loading it on first use.
+
+        Args:
+            path (Path): The requirements file.
+
+        Returns:
+            list[Any]: The entries of the file, shared with every other caller.
+        """
+        key = path.resolve()
+        entries = self.files.get(key)
+        if entries is None:
+            if not key.is_file():
+                raise FileNotFoundError(f"unable to locate the requirements file: {path}")
+            entries = self.files[key] = list(self._load(key))
+        return entries
+
+    def preload(self, paths: "Iterable[Path]", load_many: "Callable[[list[Path]], Iterable[list[Any]]]") -> None:
+        """Load every file reachable from `paths` through `-r` lines, one include level at a time.
+
+        Each level is handed to `load_many` as a whole, so it can be spread over a worker pool; results
+        are matched back to the files by position, which keeps the graph identical to a serial load.
+
+        Args:
+            paths (Iterable[Path]): The requirements files to start from.
+            load_many: Loads the entries of several files, returned in the order of the given paths.
+        """
+        pending = self._unloaded(path.resolve() for path in paths)
+
+        while pending:
+            for path in pending:
+                if not path.is_file():
+                    raise FileNotFoundError(f"unable to locate the requirements file: {path}")
+
+            for path, entries in zip(pending, load_many(pending)):
+                self.files[path] = list(entries)
+
+            pending = self._unloaded(
+                entry.path
+                for path in pending
+                for entry in self.files[path]
+                if isinstance(entry, Include) and entry.kind is LineKind.REQUIREMENTS_FILE
+            )
+
+    def _unloaded(self, paths: "Iterable[Path]") -> "list[Path]":
+        # unique paths not loaded yet, in order of appearance
+        return [path for path in dict.fromkeys(paths) if path not in self.files]
+
+    def reachable(self, paths: "Iterable[Path]") -> "list[Path]":
+        """Return the files reachable from `paths`: requirements files through `-r` lines, and `-c` files.
+
+        Args:
+            paths (Iterable[Path]): The requirements files to start from.
+
+        Returns:
+            list[Path]: The resolved paths, each once, in the order they are found.
+        """
+        files: "dict[Path, None]" = {}
+        pending = [path.resolve() for path in paths]
+        visited: "set[Path]" = set()
+        # the list grows with the includes found while going through it
+        for path in pending:
+            if path in visited:
+                continue
+            visited.add(path)
+            files[path] = None
+            for entry in self.entries(path):
+                if not isinstance(entry, Include):
+                    continue
+                if entry.kind is LineKind.REQUIREMENTS_FILE:
+                    pending.append(entry.path)
+                else:
+                    files[entry.path] = None
+        return list(files)
+
+    def walk(self, path: Path) -> "Iterator[Any]":
+        """Yield the entries reachable from a file, depth first.
+
+        `-r` includes are expanded in place, each file at most once per walk; `-c` includes are yielded as
+        `Include` entries for the caller to apply.
+
+        Args:
+            path (Path): The requirements file to start from.
+
+        Raises:
+            CleoException: If the files include each other in a cycle.
+
+        Yields:
+            Any: The dependencies of the files, and their constraints `Include` entries.
+        """
+        yield from self._walk(path.resolve(), [], set())
+
+    def _walk(self, path: Path, stack: "list[Path]", visited: "set[Path]") -> "Iterator[Any]":
+        if path in stack:
+            cycle = " -> ".join(str(p) for p in stack[stack.index(path) :] + [path])
+            raise CleoException(f"requirements files include each other in a cycle: {cycle}")
+        if path in visited:
+            return
+        visited.add(path)
+
+        stack.append(path)
+        for entry in self.entries(path):
+            if isinstance(entry, Include) and entry.kind is LineKind.REQUIREMENTS_FILE:
+                yield from self._walk(entry.path, stack, visited)
+            else:
+                yield entry
+        stack.pop()
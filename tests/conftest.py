@@ -1 +1 @@
-pytest_plugins = ["tests.fixtures.pyproject", "tests.fixtures.tmp_project"]
+pytest_plugins = ["tests.fixtures.pyproject", "tests.fixtures.tmp_project", "tests.fixtures.archive_server"]
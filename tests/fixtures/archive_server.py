@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+# standard library
+import threading
+import time
+import zipfile
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+# pypi library
+import pytest
+
+if TYPE_CHECKING:
+    # pypi library
+    from pytest import MonkeyPatch
+
+
+class ArchiveServer:
+    """A local HTTP/1.1 server with keep-alive, serving wheels built on demand.
+
+    Attributes:
+        root (Path): The served directory.
+        url (str): The base URL, ending with a slash.
+        latency (float): Seconds every request is delayed by, to make sequential downloads show.
+        connections (set[tuple[str, int]]): The client addresses of every connection accepted so far.
+        requests (int): The number of requests served so far.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.latency = 0.0
+        self.connections: "set[tuple[str, int]]" = set()
+        self.requests = 0
+
+        server = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=str(root), **kwargs)
+
+            def handle_one_request(self):
+                server.connections.add(self.client_address)
+                super().handle_one_request()
+
+            def send_head(self):
+                server.requests += 1
+                time.sleep(server.latency)
+                return super().send_head()
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}/"
+
+    def wheel(self, name: str, version: str = "1.0") -> str:
+        """Build a minimal wheel for `name` and return its URL."""
+        dist = f"{name.replace('-', '_')}-{version}"
+        filename = f"{dist}-py3-none-any.whl"
+        with zipfile.ZipFile(self.root / filename, "w") as archive:
+            archive.writestr(f"{dist}.dist-info/METADATA", f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n")
+            archive.writestr(
+                f"{dist}.dist-info/WHEEL",
+                "Wheel-Version: 1.0\nGenerator: tests\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+            )
+            archive.writestr(f"{dist}.dist-info/RECORD", "")
+        return self.url + filename
+
+    def start(self) -> None:
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def archive_server(tmp_path: Path, monkeypatch: "MonkeyPatch") -> "Iterator[ArchiveServer]":
+    root = tmp_path / "archives"
+    root.mkdir()
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+
+    server = ArchiveServer(root)
+    server.start()
+    yield server
+    server.stop()
@@ -39,5 +39,9 @@ def pyproject_toml(pyproject_toml_raw, tmp_path: "TempPathFactory"):
 
 
 @pytest.fixture(autouse=True)
-def patch_workplace_path(pyproject_toml, mocker: "MockerFixture"):
-    mocker.patch.dict("os.environ", PYPROJECT_CUSTOM_PATH=f"{pyproject_toml}")
+def patch_workplace_path(pyproject_toml, tmp_path: "TempPathFactory", mocker: "MockerFixture"):
+    mocker.patch.dict(
+        "os.environ",
+        PYPROJECT_CUSTOM_PATH=f"{pyproject_toml}",
+        POETRY_IMPORT_CACHE_DIR=f"{tmp_path}/cache",
+    )
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+# standard library
+import gc
+import itertools
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+# pypi library
+import pytest
+
+# poetry-import library
+from poetry_import import backport
+from poetry_import.backport import (
+    URL_RESOLVE_WORKERS,
+    RequirementsParserProvider,
+    _parse_cached,
+    parse_cache_info,
+    parse_dependency_specification,
+    parse_many,
+    parse_simple_specification,
+    poetry_installer,
+    requirements_parser,
+    tokenize_requirement,
+)
+
+if TYPE_CHECKING:
+    # pypi library
+    from pytest import MonkeyPatch
+    from pytest_mock import MockerFixture
+
+    # poetry-import library
+    from tests.fixtures.archive_server import ArchiveServer
+
+
+@pytest.mark.unittests
+def test_requirements_parser_provider_is_lazy_and_shared():
+    provider = RequirementsParserProvider()
+    assert not provider.is_loaded
+
+    parse = provider.get()
+
+    assert provider.is_loaded
+    assert provider.get() is parse
+    assert parse("flask==1.0") == {"name": "flask", "version": "1.0"}
+
+    provider.close()
+
+    assert not provider.is_loaded
+
+
+@pytest.mark.unittests
+def test_requirements_parser_provider_keeps_artifacts(archive_server: "ArchiveServer", tmp_path: Path):
+    url = archive_server.wheel("persisted-package")
+
+    for _ in range(2):
+        provider = RequirementsParserProvider()
+        assert provider.get()(url) == {"name": "persisted-package", "url": url}
+        provider.close()
+
+    assert archive_server.requests == 1
+    assert [archive.name for archive in (tmp_path / "cache" / "artifacts").rglob("*.whl")] == [url.rsplit("/", 1)[1]]
+
+
+NAMES = ["flask", "Django", "pydantic_settings", "zope.interface", "A-b_c.D"]
+EXTRAS = ["", "[security]", "[socks, Security]"]
+SPECIFIERS = [
+    "",
+    "==1.0",
+    "== 2.31.0",
+    "==1.0rc1",
+    ">=1.0",
+    "<2",
+    "!=1.5",
+    "==1.*",
+    ">=1.0,<2.0",
+    ">1 , <=1.5",
+    "<2.0.dev0",
+    "~=1.2",
+    ">=1.0, !=1.5",
+]
+MARKERS = [
+    "",
+    "; sys_platform == 'win32'",
+    ' ; python_version < "3.9"',
+    ';os_name!="nt"',
+    '; python_version >= "3.8" and os_name == "nt"',
+]
+COMMENTS = ["", "  # via -r requirements.in"]
+
+
+def _pep508_lines():
+    for name, extras, specifier, marker, comment in itertools.product(NAMES, EXTRAS, SPECIFIERS, MARKERS, COMMENTS):
+        yield f"{name}{extras}{specifier}{marker}{comment}"
+
+
+@pytest.mark.unittests
+def test_parse_simple_specification_agrees_with_poetry():
+    poetry_parse = requirements_parser.get()
+
+    fast_parsed = 0
+    for line in _pep508_lines():
+        specification = parse_simple_specification(line)
+        if specification is None:
+            continue
+        fast_parsed += 1
+        assert specification == poetry_parse(line), line
+
+    assert fast_parsed > 1000
+
+
+@pytest.mark.unittests
+@pytest.mark.parametrize(
+    "line",
+    [
+        "foo @ https://example.com/foo-1.0.tar.gz",
+        "https://example.com/foo-1.0.tar.gz",
+        "git+https://github.com/org/foo.git@main#egg=foo",
+        "-e ./libs/core",
+        "./vendor/pkg",
+        "foo-1.0-py3-none-any.whl",
+        "foo~=1.2",
+        "foo===1.0",
+        "foo<2,>=1",
+        "foo>=1.0rc1",
+        "foo==01.0",
+        'foo; python_version >= "3.8" and python_version < "3.9"',
+        "foo  # via bar",
+    ],
+)
+def test_parse_simple_specification_falls_back(line: str):
+    assert parse_simple_specification(line) is None
+
+
+@pytest.mark.unittests
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("flask", ("flask", (), (), None, None)),
+        ("Django ~= 4.2", ("Django", (), (("~=", "4.2"),), None, None)),
+        ("foo[a, B]===1.0", ("foo", ("a", "B"), (("===", "1.0"),), None, None)),
+        ("foo>=1.0, !=1.5 ,<2", ("foo", (), ((">=", "1.0"), ("!=", "1.5"), ("<", "2")), None, None)),
+        ("foo==1.*;os_name=='nt'", ("foo", (), (("==", "1.*"),), "os_name=='nt'", None)),
+        (
+            'foo<2 ; python_version < "3.9"  # via bar',
+            ("foo", (), (("<", "2"),), 'python_version < "3.9"', "# via bar"),
+        ),
+    ],
+)
+def test_tokenize_requirement(line: str, expected: tuple):
+    assert tokenize_requirement(line) == expected
+
+
+@pytest.mark.unittests
+@pytest.mark.parametrize(
+    "line", ["foo (>=1.0)", "foo>=1.0,", "foo>=1.0 <2", "foo @ https://example.com/foo.zip", "./vendor"]
+)
+def test_tokenize_requirement_rejects(line: str):
+    assert tokenize_requirement(line) is None
+
+
+@pytest.mark.unittests
+@pytest.mark.parametrize(
+    "line, version",
+    [
+        ("flask~=2.0", "~=2.0"),
+        ("apache-airflow[crypto]==2.9.3", "==2.9.3"),
+        ("Foo~=1.0.post1", "~=1.0.post1"),
+        ("foo==1.0.*", "==1.0.*"),
+        ("foo==1.0,<2", None),
+        ("foo==1.0-1", "==1.0-1"),
+        ("foo==v1.0", "==v1.0"),
+        # markers the fast path does not take come from Poetry, the version still from the tokens
+        ('foo==1.0 ; platform_release >= "5"', "==1.0"),
+        ('foo==1.0; python_version >= "3.8" and sys_platform == "linux"', "==1.0"),
+        ('foo~=1.0; python_version >= "3.8" and sys_platform == "linux"', "~=1.0"),
+    ],
+)
+def test_parse_many_keeps_operators(line: str, version: "str | None"):
+    poetry_specification = requirements_parser.get()(line)
+    (specification,) = parse_many([line], keep_operators=True)
+
+    assert specification == {**poetry_specification, "version": version or poetry_specification["version"]}
+
+
+@pytest.mark.benchmarks
+def test_parse_simple_specification_speedup():
+    lines = [f"package-{i}[extra]=={i % 7}.{i % 13}.{i}  # via -r requirements.in" for i in range(2000)]
+    poetry_parse = requirements_parser.get()
+
+    # a collection of the whole test session's heap would dwarf the fast path, time the parsing only
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for line in lines:
+            poetry_parse(line)
+        poetry_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for line in lines:
+            parse_dependency_specification(line)
+        fast_elapsed = time.perf_counter() - start
+    finally:
+        gc.enable()
+
+    assert fast_elapsed * 10 < poetry_elapsed, f"fast path {fast_elapsed:.4f}s vs poetry {poetry_elapsed:.4f}s"
+
+
+@pytest.mark.unittests
+def test_parse_dependency_specification_is_memoized():
+    line = "memoized-package[extra]==1.0"
+    parse_dependency_specification(line)
+    hits = parse_cache_info().hits
+
+    first = parse_dependency_specification(f"  {line}\n")
+    first["version"] = "2.0"
+    first["extras"].append("other")
+    second = parse_dependency_specification(line)
+
+    assert parse_cache_info().hits == hits + 2
+    assert second == {"name": "memoized-package", "version": "1.0", "extras": ["extra"]}
+
+
+@pytest.mark.unittests
+def test_parse_many():
+    lines = ["flask==1.0", "requests[socks]>=2.0", "flask==1.0", "foo~=1.2"]
+
+    result = list(parse_many(lines))
+
+    assert result == [parse_dependency_specification(line) for line in lines]
+    assert result[0] is not result[2]
+
+
+@pytest.mark.unittests
+def test_parse_many_parses_each_line_once(mocker: "MockerFixture"):
+    lines = [f"batch-package-{i % 500}[extra]=={i % 500}.0" for i in range(10_000)]
+    lines += [f"batch-compatible-{i % 100}~={i % 100}.1" for i in range(2_000)]
+    parse = mocker.patch.object(backport, "_parse_cached", wraps=_parse_cached)
+
+    result = list(parse_many(lines))
+
+    # the first occurrence goes to the parser, repeated lines are copied from it
+    assert sorted(call.args[0] for call in parse.call_args_list) == sorted(set(lines))
+    assert result == [parse_dependency_specification(line) for line in lines]
+    result[0]["extras"].append("other")
+    assert result[500]["extras"] == ["extra"]
+
+
+@pytest.mark.unittests
+def test_parse_many_resolves_urls_concurrently_in_order(archive_server: "ArchiveServer"):
+    urls = [archive_server.wheel(f"remote-package-{i}") for i in range(12)]
+    lines = [line for i, url in enumerate(urls) for line in (url, f"local-package-{i}==1.0")]
+    lines.append(f"named-package @ {archive_server.url}named-package-1.0.tar.gz")
+
+    result = list(parse_many(lines))
+
+    assert result[:-1:2] == [{"name": f"remote-package-{i}", "url": url} for i, url in enumerate(urls)]
+    assert result[1::2] == [{"name": f"local-package-{i}", "version": "1.0"} for i in range(12)]
+    assert result[-1] == {"name": "named-package", "url": f"{archive_server.url}named-package-1.0.tar.gz"}
+    assert archive_server.requests == len(urls)
+    assert len(archive_server.connections) <= URL_RESOLVE_WORKERS
+
+
+@pytest.mark.benchmarks
+def test_parse_many_url_resolution_speedup(archive_server: "ArchiveServer", monkeypatch: "MonkeyPatch"):
+    requirements_parser.get()
+    archive_server.latency = 0.05
+
+    monkeypatch.setattr(backport, "URL_RESOLVE_WORKERS", 1)
+    serial_urls = [archive_server.wheel(f"serial-package-{i}") for i in range(16)]
+    start = time.perf_counter()
+    list(parse_many(serial_urls))
+    serial_elapsed = time.perf_counter() - start
+
+    monkeypatch.setattr(backport, "URL_RESOLVE_WORKERS", URL_RESOLVE_WORKERS)
+    concurrent_urls = [archive_server.wheel(f"concurrent-package-{i}") for i in range(16)]
+    start = time.perf_counter()
+    list(parse_many(concurrent_urls))
+    concurrent_elapsed = time.perf_counter() - start
+
+    assert concurrent_elapsed * 2 < serial_elapsed, f"{concurrent_elapsed:.4f}s vs serial {serial_elapsed:.4f}s"
+
+
+@pytest.mark.unittests
+def test_poetry_installer(tmp_path: Path, mocker: "MockerFixture"):
+    # pypi library
+    from cleo.io.null_io import NullIO
+    from poetry.installation.installer import Installer
+    from poetry.utils.env import EnvManager, MockEnv
+
+    (tmp_path / "pyproject.toml").write_text('[project]\nname = "demo"\nversion = "0.1.0"\ndependencies = []\n')
+    mocker.patch.object(EnvManager, "create_venv", return_value=MockEnv())
+
+    init = mocker.spy(Installer, "__init__")
+
+    installer = poetry_installer(NullIO(), tmp_path)
+
+    assert isinstance(installer, Installer)
+    assert installer._package.name == "demo"
+    assert init.call_args.kwargs["disable_cache"] is False
+
+    # `poetry --no-cache` reaches the installer, as with Poetry's own commands
+    poetry_installer(NullIO(), tmp_path, disable_cache=True)
+    assert init.call_args.kwargs["disable_cache"] is True
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+# standard library
+import os
+from pathlib import Path
+
+# pypi library
+import pytest
+
+# poetry-import library
+from poetry_import.cache import ArtifactStore, FingerprintStore, ParseCache, cache_root
+
+
+@pytest.fixture
+def parse_cache(tmp_path: Path) -> ParseCache:
+    return ParseCache(tmp_path / "parse")
+
+
+@pytest.mark.unittests
+def test_cache_root_honours_env(tmp_path: Path):
+    assert cache_root() == tmp_path / "cache"
+    assert ParseCache.default().directory == tmp_path / "cache" / "parse"
+    assert ArtifactStore.default().directory == tmp_path / "cache" / "artifacts"
+
+
+@pytest.mark.unittests
+def test_parse_cache_roundtrip(parse_cache: ParseCache, tmp_path: Path):
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("flask==1.0\n")
+    records = [{"name": "flask", "version": "==1.0"}]
+
+    key = parse_cache.key(requirements)
+    assert parse_cache.get(key) is None
+
+    parse_cache.set(key, records)
+    assert parse_cache.get(parse_cache.key(requirements)) == records
+    assert (parse_cache.hits, parse_cache.misses) == (1, 1)
+
+    requirements.write_text("flask==2.0\n")
+    assert parse_cache.key(requirements) != key
+
+    parse_cache.clear()
+    assert parse_cache.get(key) is None
+
+
+@pytest.mark.unittests
+def test_parse_cache_evicts_least_recently_used(parse_cache: ParseCache):
+    parse_cache.set("old", [{"name": "flask"}])
+    os.utime(parse_cache.directory / "old.jsonl", (0, 0))
+    parse_cache.max_bytes = (parse_cache.directory / "old.jsonl").stat().st_size + 8
+    parse_cache.set("new", [{"name": "django"}])
+
+    assert parse_cache.get("old") is None
+    assert parse_cache.get("new") == [{"name": "django"}]
+
+
+@pytest.mark.unittests
+def test_artifact_store_evicts_least_recently_used(tmp_path: Path):
+    store = ArtifactStore(tmp_path / "artifacts", max_bytes=1500)
+    archives = []
+    for key in ("aa", "bb", "cc"):
+        entry = store.directory / key / key / key / "0123"
+        entry.mkdir(parents=True)
+        archive = entry / f"{key}-1.0.tar.gz"
+        archive.write_bytes(b"x" * 1000)
+        os.utime(entry, (0, 0))
+        archives.append(archive)
+
+    store.touch(archives[0])
+    store.evict()
+
+    assert [archive.exists() for archive in archives] == [True, False, False]
+
+
+@pytest.mark.unittests
+def test_fingerprint_store(tmp_path: Path):
+    store = FingerprintStore(tmp_path / "fingerprints")
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text("[project]\n")
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("flask==1.0\n")
+    lock = tmp_path / "poetry.lock"
+
+    assert not store.matches(pyproject, "key")
+    store.save(pyproject, "key", [requirements, lock])
+    assert store.matches(pyproject, "key")
+    assert not store.matches(pyproject, "other key")
+    assert not store.matches(tmp_path / "other.toml", "key")
+
+    requirements.write_text("flask==2.0\n")
+    assert not store.matches(pyproject, "key")
+    store.save(pyproject, "key", [requirements, lock])
+
+    lock.write_text("")
+    assert not store.matches(pyproject, "key")
+    lock.unlink()
+    pyproject.write_text('[project]\nname = "demo"\n')
+    assert not store.matches(pyproject, "key")
+
+    store.save(pyproject, "key", [requirements, lock])
+    store.clear()
+    assert not store.matches(pyproject, "key")
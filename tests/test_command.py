@@ -1,21 +1,32 @@
 from __future__ import annotations
 
 # standard library
+import json
+import os
+import threading
+import time
+import tracemalloc
 from pathlib import Path
 from typing import TYPE_CHECKING
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, call, patch
 
 # pypi library
 import pytest
+from cleo.application import Application
 from cleo.io.buffered_io import BufferedIO
 from cleo.io.inputs.string_input import StringInput
+from cleo.testers.command_tester import CommandTester
+from tomlkit import parse
 
 # poetry-import library
-from poetry_import.command import ImportReqCommand
+from poetry_import.backport import CleoException
+from poetry_import.cache import LocalMetadataCache, ParseCache
+from poetry_import.command import DRIFT_EXIT_CODE, ImportReqCommand, _inspect_local_package
 
 if TYPE_CHECKING:
     # pypi library
     from _pytest._py.path import LocalPath  # type: ignore
+    from pytest import MonkeyPatch
     from pytest_mock import MockerFixture
 
     # poetry-import library
@@ -98,11 +109,34 @@ def test_lock_or_install_dependencies(
         command.lock_or_install_dependencies()
         mock_run.assert_called_with("lock")
 
-    # Test with 'install' option
+    # Test with 'install' option, solving and installing the groups the import changed in process
     command.option = MagicMock(side_effect=lambda x: x == "install")
+    installer = mocker.patch("poetry_import.command.poetry_installer").return_value
+    installer.run.return_value = 0
     with patch.object(command, "call") as mock_run:
         command.lock_or_install_dependencies()
-        mock_run.assert_called_with("install")  # Assert that poetry.run was called once with 'install'
+        mock_run.assert_not_called()
+    installer.only_groups.assert_called_once_with(["main"])
+    installer.update.assert_called_once_with(True)
+    installer.run.assert_called_once_with()
+
+    command.update_pyproject_toml({**result, "dev": [{"name": "Py_Test", "version": "8.0"}]})
+    with patch.object(command, "call") as mock_run:
+        command.lock_or_install_dependencies()
+    installer.only_groups.assert_called_with(["dev"])
+
+    # Poetry without the installer API: run the commands
+    mocker.patch("poetry_import.command.poetry_installer", side_effect=ImportError)
+    command.update_pyproject_toml({**result, "test": [{"name": "coverage", "version": "7.0"}]})
+    with patch.object(command, "call") as mock_run:
+        command.lock_or_install_dependencies()
+        assert mock_run.call_args_list == [call("lock"), call("install", "--only test")]
+
+    # Test with nothing new to import (should not lock nor install)
+    command.update_pyproject_toml(result)
+    with patch.object(command, "call") as mock_run:
+        command.lock_or_install_dependencies()
+        mock_run.assert_not_called()
 
     # Test with no update/install (should not call poetry.run)
     command.option = MagicMock(return_value=False)
@@ -233,3 +267,765 @@ def test_command_format_tokens(
 
     # Restore the original method to avoid affecting other tests
     command._fromat_tokens = original_format_tokens
+
+
+@pytest.mark.unittests
+def test_parse_requirements_file_uses_parse_cache(
+    command: "ImportReqCommand", project: "Project", mocker: "MockerFixture", tmp_path: Path
+):
+    command._parse_cache = ParseCache(tmp_path / "parse")
+    expected = [{"name": "flask", "version": "2.0"}, {"name": "django", "version": "==3.0"}]
+
+    assert command._parse_requirements_file([project["req_a"]], {"flask": "2.0"}) == expected
+
+    next_command = ImportReqCommand()
+    next_command._parse_cache = ParseCache(tmp_path / "parse")
+    read_requirements_file = mocker.patch.object(next_command, "_read_requirements_file")
+    assert next_command._parse_requirements_file([project["req_a"]], {"flask": "2.0"}) == expected
+    read_requirements_file.assert_not_called()
+    assert next_command._parse_cache.hits == 1
+
+
+def _peak_parse_memory(requirements: Path, cache: ParseCache) -> int:
+    command = ImportReqCommand()
+    command._parse_cache = cache
+    tracemalloc.start()
+    try:
+        command._parse_group_specifications({"root": [f"{requirements}"]}, {})
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+@pytest.mark.benchmarks
+def test_parse_group_specifications_memory_follows_requirements(tmp_path: Path):
+    def write(path: Path, requirements: int, hashes: int) -> Path:
+        lines = "".join(f"    # --hash=sha256:{i:064x}\n" for i in range(hashes))
+        path.write_text("".join(f"package-{i}=={i}.0\n{lines}" for i in range(requirements)))
+        return path
+
+    small = write(tmp_path / "small.txt", 200, 5)
+    # 10 times the requirements, 100 times the bytes
+    large = write(tmp_path / "large.txt", 2000, 50)
+    cache = ParseCache(tmp_path / "cache")
+
+    _peak_parse_memory(write(tmp_path / "warm-up.txt", 200, 5), cache)  # warm up the parser caches
+    # a miss parses the file and writes the cache entry, a hit reads the entry back
+    small_peak = max(_peak_parse_memory(small, cache) for _ in range(2))
+    large_peak = max(_peak_parse_memory(large, cache) for _ in range(2))
+
+    assert large.stat().st_size > 90 * small.stat().st_size
+    assert cache.hits == 2 and cache.misses == 3
+    # the records kept grow with the requirements, the comment and hash lines are never held
+    assert large_peak < 15 * small_peak, f"peak memory grew from {small_peak} to {large_peak} bytes"
+    assert large_peak < large.stat().st_size / 4, f"peak memory {large_peak} bytes"
+
+
+@pytest.mark.unittests
+def test_parse_requirements_file_pip_compile_output(command: "ImportReqCommand", tmp_path: Path):
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text(
+        "certifi==2024.2.2 \\\n"
+        "    --hash=sha256:0569859f95fc761b18b45ef421b1290a0f65f147e92a1e5eb3e635f9a5e4e66f \\\n"
+        "    --hash=sha256:dc383c07b76109f368f6106eee2b593b04a011ea4d55f652c6ca24a754d1cdd1\n"
+        "    # via requests\n"
+        "idna==3.6 \\\n"
+        "    --hash=sha256:9ecdbbd083b06798ae1e86adcbfe8ab1479cf864e4ee30fe4e46a003d12491ca\n"
+        "    # via requests\n"
+    )
+
+    assert command._parse_requirements_file([requirements], {}) == [
+        {"name": "certifi", "version": "==2024.2.2"},
+        {"name": "idna", "version": "==3.6"},
+    ]
+
+
+@pytest.mark.unittests
+def test_parse_group_specifications_follows_includes(
+    command: "ImportReqCommand", tmp_path: Path, mocker: "MockerFixture"
+):
+    (tmp_path / "base.txt").write_text("requests==2.31.0\nflask==1.0\n")
+    (tmp_path / "constraints.txt").write_text("flask==2.0\n")
+    (tmp_path / "app.txt").write_text("-r base.txt\n-c constraints.txt\ndjango==3.0\n")
+    (tmp_path / "dev.txt").write_text("-r base.txt\nruff==0.4.4\n")
+    read_requirements_file = mocker.spy(command, "_read_requirements_file")
+
+    result = command._parse_group_specifications(
+        {"root": [f"{tmp_path / 'app.txt'}"], "dev": [f"{tmp_path / 'dev.txt'}"]}, {}
+    )
+
+    assert result == {
+        "root": [
+            {"name": "requests", "version": "==2.31.0"},
+            {"name": "flask", "version": "2.0"},
+            {"name": "django", "version": "==3.0"},
+        ],
+        "dev": [
+            {"name": "requests", "version": "==2.31.0"},
+            {"name": "flask", "version": "==1.0"},
+            {"name": "ruff", "version": "==0.4.4"},
+        ],
+    }
+    assert read_requirements_file.call_count == 3
+    assert result["root"][0] is result["dev"][0]
+
+
+@pytest.mark.unittests
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parse_group_specifications_in_parallel(tmp_path: Path, executor: str):
+    (tmp_path / "base.txt").write_text("".join(f"base-{i}=={i}.0\n" for i in range(50)))
+    groups: "dict[str, list[str]]" = {}
+    for i in range(8):
+        requirements = tmp_path / f"group-{i}.txt"
+        requirements.write_text("-r base.txt\n" + "".join(f"package-{i}-{j}~={j}.0\n" for j in range(20)))
+        groups[f"group-{i}"] = [f"{requirements}"]
+
+    serial = ImportReqCommand()._parse_group_specifications(groups, {"base-1": "2.0"})
+
+    parallel_command = ImportReqCommand()
+    parallel_command._jobs, parallel_command._executor = 4, executor
+    parallel_command._parse_cache = ParseCache(tmp_path / "parse")
+    parallel = parallel_command._parse_group_specifications(groups, {"base-1": "2.0"})
+
+    assert list(parallel) == list(serial)
+    assert parallel == serial
+    assert len(list((tmp_path / "parse").glob("*.jsonl"))) == 9
+
+
+def _local_project(path: Path, name: str) -> Path:
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "pyproject.toml").write_text(
+        f'[project]\nname = "{name}"\nversion = "0.1.0"\n\n'
+        '[build-system]\nrequires = ["poetry-core>=2"]\nbuild-backend = "poetry.core.masonry.api"\n'
+    )
+    return path
+
+
+@pytest.mark.unittests
+def test_parse_requirements_file_local_projects(
+    command: "ImportReqCommand", tmp_path: Path, monkeypatch: "MonkeyPatch"
+):
+    monkeypatch.chdir(tmp_path)
+    _local_project(tmp_path / "libs" / "core", "Core_Lib")
+    _local_project(tmp_path / "vendor" / "util", "util-lib")
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("-e ./libs/core\n./vendor/util[extra]\nflask==1.0\n")
+
+    assert command._parse_requirements_file([requirements], {"core-lib": "2.0"}) == [
+        {"name": "core-lib", "path": "./libs/core", "develop": True},
+        {"name": "util-lib", "path": "./vendor/util", "extras": ["extra"]},
+        {"name": "flask", "version": "==1.0"},
+    ]
+
+
+@pytest.mark.unittests
+def test_local_project_paths_are_relative_to_the_pyproject(
+    command: "ImportReqCommand", tmp_path: Path, monkeypatch: "MonkeyPatch"
+):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PYPROJECT_CUSTOM_PATH", str(tmp_path / "app" / "pyproject.toml"))
+    _local_project(tmp_path / "libs" / "core", "core-lib")
+    _local_project(tmp_path / "app" / "vendor" / "util", "util-lib")
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text(f"-e ./libs/core\napp/vendor/util\n{tmp_path / 'libs' / 'core'}\n")
+
+    assert command._parse_requirements_file([requirements], {}) == [
+        {"name": "core-lib", "path": "../libs/core", "develop": True},
+        {"name": "util-lib", "path": "./vendor/util"},
+        {"name": "core-lib", "path": "../libs/core"},
+    ]
+
+
+@pytest.mark.unittests
+def test_local_project_metadata_is_cached(tmp_path: Path, monkeypatch: "MonkeyPatch", mocker: "MockerFixture"):
+    monkeypatch.chdir(tmp_path)
+    core = _local_project(tmp_path / "libs" / "core", "core-lib")
+    _local_project(tmp_path / "libs" / "util", "util-lib")
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("-e ./libs/core\n-e ./libs/util\n")
+    inspect = mocker.patch("poetry_import.command._inspect_local_package", side_effect=_inspect_local_package)
+
+    def parse_names() -> "list[str]":
+        command = ImportReqCommand()
+        command._parse_cache = ParseCache(tmp_path / "parse")
+        command._metadata_cache = LocalMetadataCache(tmp_path / "local")
+        return [dep["name"] for dep in command._parse_group_specifications({"root": [f"{requirements}"]}, {})["root"]]
+
+    assert parse_names() == ["core-lib", "util-lib"]
+    assert parse_names() == ["core-lib", "util-lib"]
+    assert inspect.call_count == 2
+
+    (core / "README.md").write_text("not part of the fingerprint")
+    assert parse_names() == ["core-lib", "util-lib"]
+    assert inspect.call_count == 2
+
+    _local_project(core, "core-lib-renamed")
+    assert parse_names() == ["core-lib-renamed", "util-lib"]
+    assert inspect.call_count == 3
+
+
+@pytest.mark.unittests
+def test_local_projects_are_inspected_in_parallel(
+    command: "ImportReqCommand", tmp_path: Path, monkeypatch: "MonkeyPatch", mocker: "MockerFixture"
+):
+    monkeypatch.chdir(tmp_path)
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("".join(f"./libs/lib-{i}\n" for i in range(8)))
+    for i in range(8):
+        (tmp_path / "libs" / f"lib-{i}").mkdir(parents=True)
+
+    threads = set()
+
+    def inspect(path: Path) -> "dict[str, str]":
+        threads.add(threading.get_ident())
+        time.sleep(0.05)
+        return {"name": path.name}
+
+    mocker.patch("poetry_import.command._inspect_local_package", side_effect=inspect)
+    specs = command._parse_group_specifications({"root": [f"{requirements}"]}, {})
+
+    assert [dep["name"] for dep in specs["root"]] == [f"lib-{i}" for i in range(8)]
+    assert len(threads) > 1
+
+
+@pytest.mark.unittests
+def test_update_pyproject_toml_local_projects(
+    command: "ImportReqCommand", pyproject_toml, pyproject_toml_v2, pyproject_toml_raw, mocker: "MockerFixture"
+):
+    group_specs = {"dev": [{"name": "core-lib", "path": "./libs/core", "develop": True}]}
+    command.option = lambda x: "v1" if x == "poetry-version" else None  # type: ignore
+    command.update_pyproject_toml(group_specs)
+
+    assert Path(pyproject_toml).read_text() == pyproject_toml_raw + (
+        '\n[tool.poetry.group.dev.dependencies]\ncore-lib = {path = "./libs/core", develop = true}\n'
+    )
+
+    mocker.patch.dict("os.environ", PYPROJECT_CUSTOM_PATH=str(pyproject_toml_v2))
+    command.option = lambda x: "v2" if x == "poetry-version" else None  # type: ignore
+    command.line = lambda *args, **kwargs: None  # type: ignore
+    command.update_pyproject_toml({"root": [{"name": "core-lib", "path": "./libs/core", "develop": True}]})
+
+    updated_content = Path(pyproject_toml_v2).read_text()
+    assert 'dependencies = ["core-lib"]' in updated_content
+    assert '[tool.poetry.dependencies]\ncore-lib = {path = "./libs/core", develop = true}' in updated_content
+
+
+@pytest.mark.unittests
+def test_parse_group_specifications_layers_constraints(command: "ImportReqCommand", tmp_path: Path):
+    (tmp_path / "base-constraints.txt").write_text("Django==2.0\npydantic_settings==2.0\nflask\n")
+    (tmp_path / "constraints.txt").write_text("DJANGO==2.2\n")
+    (tmp_path / "nested-constraints.txt").write_text("Flask==1.1\nruff==0.1.0\n")
+    (tmp_path / "app.txt").write_text("-c nested-constraints.txt\ndjango==3.0\npydantic-settings\nflask==1.0\nruff\n")
+    (tmp_path / "dev.txt").write_text("ruff==0.4.4\n")
+
+    constraints = command._parse_constraints_specifications(
+        [f"{tmp_path / 'base-constraints.txt'}", f"{tmp_path / 'constraints.txt'}"]
+    )
+    specs = command._parse_group_specifications(
+        {"root": [f"{tmp_path / 'app.txt'}"], "dev": [f"{tmp_path / 'dev.txt'}"]}, constraints
+    )
+
+    assert constraints == {"django": "2.2", "pydantic-settings": "2.0"}
+    assert specs == {
+        "root": [
+            {"name": "django", "version": "2.2"},
+            {"name": "pydantic-settings", "version": "2.0"},
+            {"name": "flask", "version": "1.1"},
+            {"name": "ruff", "version": "0.1.0"},
+        ],
+        "dev": [{"name": "ruff", "version": "==0.4.4"}],
+    }
+
+
+@pytest.mark.unittests
+def test_command_accepts_several_constraint_files(pyproject_toml, tmp_path: Path):
+    (tmp_path / "requirements.txt").write_text("flask==1.0\ndjango==3.0\n")
+    (tmp_path / "a.txt").write_text("flask==2.0\ndjango==2.0\n")
+    (tmp_path / "b.txt").write_text("Django==2.2\n")
+
+    command = ImportReqCommand()
+    Application().add(command)  # for the global options, e.g. --verbose
+    tester = CommandTester(command)
+    status = tester.execute(f"{tmp_path / 'requirements.txt'} -c {tmp_path / 'a.txt'} -c {tmp_path / 'b.txt'}")
+
+    assert status == 0, tester.io.fetch_error()
+    assert '"flask (>=2.0)",\n    "django (>=2.2)",' in Path(pyproject_toml).read_text()
+
+
+@pytest.mark.unittests
+def test_update_pyproject_toml_indexes_existing_dependencies(
+    command: "ImportReqCommand", pyproject_toml, pyproject_toml_raw
+):
+    Path(pyproject_toml).write_text(pyproject_toml_raw + '"Zope.Interface" = "6.0"\n')
+    warnings = []
+    command.option = lambda x: "v1" if x == "poetry-version" else None  # type: ignore
+    command.line = lambda text, style=None: warnings.append(text) if style == "warning" else None  # type: ignore
+
+    command.update_pyproject_toml(
+        {
+            "root": [{"name": "zope-interface", "version": "7.0"}, {"name": "flask", "version": "1.0"}],
+            "dev": [
+                {"name": "Flask", "version": "2.0"},
+                {"name": "pytest", "version": "8.0"},
+                {"name": "PyTest", "version": "7.0"},
+            ],
+        }
+    )
+
+    assert Path(pyproject_toml).read_text() == pyproject_toml_raw + (
+        '"Zope.Interface" = "6.0"\n'
+        'flask = "1.0"\n'
+        "\n[tool.poetry.group.dev.dependencies]\n"
+        'Flask = "2.0"\n'
+        'pytest = "8.0"\n'
+    )
+    assert warnings == ["Flask is required as 2.0 in group 'dev' but 1.0 in group 'root'"]
+
+
+@pytest.mark.unittests
+def test_update_pyproject_toml_v2_keeps_existing_entries(
+    command: "ImportReqCommand", pyproject_toml_v2, mocker: "MockerFixture"
+):
+    mocker.patch.dict("os.environ", PYPROJECT_CUSTOM_PATH=str(pyproject_toml_v2))
+    content = Path(pyproject_toml_v2).read_text()
+    Path(pyproject_toml_v2).write_text(
+        content.replace("dependencies = []", 'dependencies = [\n    "flask>=2",\n    "requests",\n]')
+    )
+    command.option = lambda x: "v2" if x == "poetry-version" else None  # type: ignore
+    command.line = lambda *args, **kwargs: None  # type: ignore
+
+    command.update_pyproject_toml({"root": [{"name": "Flask", "version": "2.0"}, {"name": "attrs", "version": "23.1"}]})
+
+    assert 'dependencies = [\n    "flask>=2",\n    "requests",\n    "attrs (>=23.1)",\n]' in (
+        Path(pyproject_toml_v2).read_text()
+    )
+
+
+@pytest.mark.unittests
+def test_update_pyproject_toml_v2_adds_packages_only_overridden_by_poetry(
+    command: "ImportReqCommand", pyproject_toml_v2, mocker: "MockerFixture"
+):
+    mocker.patch.dict("os.environ", PYPROJECT_CUSTOM_PATH=str(pyproject_toml_v2))
+    content = Path(pyproject_toml_v2).read_text()
+    Path(pyproject_toml_v2).write_text(
+        content.replace("dependencies = []", 'dependencies = [\n    "requests",\n]')
+        + '\n[tool.poetry.dependencies]\nmylib = {path = "../mylib", develop = true}\n'
+    )
+    command.option = lambda x: "v2" if x == "poetry-version" else None  # type: ignore
+    command.line = lambda *args, **kwargs: None  # type: ignore
+
+    command.update_pyproject_toml({"root": [{"name": "mylib", "version": "1.0"}, {"name": "requests"}]})
+
+    updated = parse(Path(pyproject_toml_v2).read_text())
+    assert list(updated["project"]["dependencies"]) == ["requests", "mylib (>=1.0)"]
+    assert updated["tool"]["poetry"]["dependencies"]["mylib"] == {"path": "../mylib", "develop": True}
+    assert command._changed_dependencies == {"root": ["mylib"]}
+
+
+def _time_project_update(command: "ImportReqCommand", pyproject: Path, size: int) -> float:
+    existing = ",\n".join(f'    "existing-{i} (>={i}.0)"' for i in range(size))
+    pyproject.write_text(f'[project]\nname = "bench"\ndependencies = [\n{existing},\n]\n')
+    specs = {"root": [{"name": f"added-{i}", "version": f"{i}.0"} for i in range(size)]}
+
+    start = time.perf_counter()
+    command.update_pyproject_toml(specs)
+    elapsed = time.perf_counter() - start
+
+    assert len(parse(pyproject.read_text())["project"]["dependencies"]) == 2 * size
+    return elapsed
+
+
+@pytest.mark.benchmarks
+def test_update_pyproject_toml_v2_scales_linearly(command: "ImportReqCommand", tmp_path: Path, mocker):
+    pyproject = tmp_path / "bench.toml"
+    mocker.patch.dict("os.environ", PYPROJECT_CUSTOM_PATH=str(pyproject))
+    command.option = lambda x: "v2" if x == "poetry-version" else None  # type: ignore
+    command.line = lambda *args, **kwargs: None  # type: ignore
+
+    _time_project_update(command, pyproject, 100)  # warm up
+    half = min(_time_project_update(command, pyproject, 1_000) for _ in range(3))
+    full = min(_time_project_update(command, pyproject, 2_000) for _ in range(3))
+
+    # twice the entries, about twice the time; appending one by one took over four times as long
+    assert full < 3 * half, f"2,000 entries {full:.4f}s vs 1,000 entries {half:.4f}s"
+
+
+@pytest.mark.unittests
+def test_update_pyproject_toml_builds_group_tables(command: "ImportReqCommand", pyproject_toml, pyproject_toml_raw):
+    Path(pyproject_toml).write_text(
+        pyproject_toml_raw.replace("keywords = [", 'keywords = ["group.dev.dependencies", ')
+        + '\n[build-system]\nrequires = ["poetry-core"]\n'
+    )
+    command.option = lambda x: "v1" if x == "poetry-version" else None  # type: ignore
+
+    command.update_pyproject_toml(
+        {"dev": [{"name": "flask", "version": "1.0"}], "lint": [{"name": "ruff", "version": "0.4.4"}]}
+    )
+
+    assert Path(pyproject_toml).read_text() == (
+        pyproject_toml_raw.replace("keywords = [", 'keywords = ["group.dev.dependencies", ')
+        + '\n[tool.poetry.group.dev.dependencies]\nflask = "1.0"\n'
+        + '\n[tool.poetry.group.lint.dependencies]\nruff = "0.4.4"\n'
+        + '\n[build-system]\nrequires = ["poetry-core"]\n'
+    )
+
+
+@pytest.mark.unittests
+def test_update_pyproject_toml_skips_unchanged_file(command: "ImportReqCommand", pyproject_toml):
+    command.option = lambda x: "v1" if x == "poetry-version" else None  # type: ignore
+    command.update_pyproject_toml({"dev": [{"name": "flask", "version": "1.0"}]})
+    os.utime(pyproject_toml, (0, 0))
+
+    command.update_pyproject_toml({"dev": [{"name": "Flask", "version": "1.0"}]})
+
+    assert Path(pyproject_toml).stat().st_mtime == 0
+
+
+@pytest.mark.unittests
+def test_command_skips_unchanged_import(pyproject_toml, tmp_path: Path, mocker: "MockerFixture"):
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("flask==1.0\n")
+    poetry_call = mocker.patch.object(ImportReqCommand, "call", return_value=0)
+
+    def run(args: str) -> str:
+        command = ImportReqCommand()
+        Application().add(command)
+        tester = CommandTester(command)
+        assert tester.execute(f"{requirements} --lock {args}") == 0, tester.io.fetch_error()
+        return tester.io.fetch_output()
+
+    run("")
+    os.utime(pyproject_toml, (0, 0))
+    parse = mocker.spy(ImportReqCommand, "_parse_group_specifications")
+
+    assert "Nothing changed since the last import" in run("")
+    assert parse.call_count == 0
+    assert poetry_call.call_count == 1
+    assert Path(pyproject_toml).stat().st_mtime == 0
+
+    run("--force")
+    assert parse.call_count == 1
+    assert poetry_call.call_count == 1  # nothing new to lock
+
+    run("--no-update")  # different options
+    assert parse.call_count == 2
+
+    (tmp_path / "poetry.lock").write_text("")
+    run("--no-update")
+    requirements.write_text("flask==1.0\ndjango==3.0\n")
+    run("--no-update")
+    assert parse.call_count == 4
+    assert '"django (==3.0)"' in Path(pyproject_toml).read_text()
+
+
+@pytest.mark.unittests
+def test_command_previews_changes(pyproject_toml, tmp_path: Path, mocker: "MockerFixture"):
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("flask==1.0\nrequests>=2.0,<3.0\n")
+    original = Path(pyproject_toml).read_text()
+    poetry_call = mocker.patch.object(ImportReqCommand, "call", return_value=0)
+
+    def run(args: str) -> "tuple[int, str]":
+        command = ImportReqCommand()
+        Application().add(command)
+        tester = CommandTester(command)
+        status = tester.execute(f"{requirements} --lock {args}")
+        return status, tester.io.fetch_output()
+
+    status, output = run("--dry-run")
+    assert status == DRIFT_EXIT_CODE
+    assert json.loads(output) == {
+        "pyproject": str(pyproject_toml),
+        "changed": True,
+        "dependencies": {"added": {"root": {"flask": "1.0", "requests": ">=2.0,<3.0"}}},
+    }
+
+    status, output = run("--diff")
+    assert status == DRIFT_EXIT_CODE
+    assert output.startswith(f"--- {pyproject_toml}\n+++ {pyproject_toml}\n")
+    assert '+    "flask (==1.0)",\n+    "requests (>=2.0,<3.0)",\n' in output
+
+    assert Path(pyproject_toml).read_text() == original
+    assert poetry_call.call_count == 0
+
+    assert run("")[0] == 0
+    assert run("--diff") == (0, "")
+    status, output = run("--dry-run --force")
+    assert status == 0
+    assert json.loads(output) == {"pyproject": str(pyproject_toml), "changed": False, "dependencies": {}}
+
+
+@pytest.mark.unittests
+@pytest.mark.parametrize(
+    "poetry_version, no_update, whitelist", [("2.1.0", False, True), ("1.8.3", False, False), ("1.8.3", True, True)]
+)
+def test_install_keeps_locked_versions(
+    command: "ImportReqCommand", poetry_version: str, no_update: bool, whitelist: bool, mocker: "MockerFixture"
+):
+    mocker.patch("poetry_import.command.package_version", return_value=poetry_version)
+    installer = mocker.patch("poetry_import.command.poetry_installer").return_value
+    installer.run.return_value = 0
+    command.option = lambda x: x == "install" or (x == "no-update" and no_update)  # type: ignore
+    command.line = lambda *args, **kwargs: None  # type: ignore
+    command._changed_dependencies = {"root": ["flask"], "dev": ["pytest", "ruff"]}
+
+    command.lock_or_install_dependencies()
+
+    installer.only_groups.assert_called_once_with(["main", "dev"])
+    installer.whitelist.assert_called_once_with(["flask", "pytest", "ruff"] if whitelist else [])
+
+    installer.run.return_value = 1
+    with pytest.raises(CleoException, match="exit code 1"):
+        command.lock_or_install_dependencies()
+
+
+@pytest.mark.unittests
+def test_update_pyproject_toml_sync_v1(command: "ImportReqCommand", pyproject_toml, pyproject_toml_raw):
+    Path(pyproject_toml).write_text(
+        pyproject_toml_raw
+        + 'Flask = {version = "1.0", extras = ["async"]}\nrequests = "2.0"\nattrs = "23.1"\n'
+        + '\n[tool.poetry.group.dev.dependencies]\npytest = "7.0"\nruff = "0.4.4"\n'
+        + '\n[tool.poetry.group.lint.dependencies]\nmypy = "1.0"\n'
+    )
+    lines = []
+    command.option = lambda x: "v1" if x == "poetry-version" else None  # type: ignore
+    command.line = lambda text, style=None: lines.append(text)  # type: ignore
+    command._sync_groups = {"root", "dev"}
+
+    command.update_pyproject_toml(
+        {
+            "root": [{"name": "flask", "version": "2.0"}, {"name": "requests", "version": "==2.0"}],
+            "dev": [{"name": "pytest", "version": "8.0"}, {"name": "coverage", "version": "7.0"}],
+            "lint": [{"name": "black", "version": "24.1"}],
+        }
+    )
+
+    # names keep their spelling, inline tables their other keys, and groups without --sync are only added to
+    assert Path(pyproject_toml).read_text() == pyproject_toml_raw + (
+        'Flask = {version = "2.0", extras = ["async"]}\nrequests = "2.0"\n'
+        '\n[tool.poetry.group.dev.dependencies]\npytest = "8.0"\ncoverage = "7.0"\n'
+        '\n[tool.poetry.group.lint.dependencies]\nmypy = "1.0"\nblack = "24.1"\n'
+    )
+    assert command._changed_dependencies == {"dev": ["coverage", "pytest"], "lint": ["black"], "root": ["flask"]}
+    assert command._removed_dependencies == {"dev": ["ruff"], "root": ["attrs"]}
+    assert lines == [
+        "Synced group 'dev':",
+        "  + coverage (7.0)",
+        "  ~ pytest (7.0) -> 8.0",
+        "  - ruff (0.4.4)",
+        "Synced group 'lint':",
+        "  + black (24.1)",
+        "Synced group 'root':",
+        "  ~ flask (1.0) -> 2.0",
+        "  - attrs (23.1)",
+    ]
+
+    lines.clear()
+    command.update_pyproject_toml(
+        {"root": [{"name": "Flask", "version": "2.0"}, {"name": "requests", "version": "2.0"}]}
+    )
+    assert lines == ["The dependencies already match the requirements files."]
+
+
+@pytest.mark.unittests
+def test_update_pyproject_toml_sync_v2(command: "ImportReqCommand", pyproject_toml_v2, mocker: "MockerFixture"):
+    mocker.patch.dict("os.environ", PYPROJECT_CUSTOM_PATH=str(pyproject_toml_v2))
+    content = Path(pyproject_toml_v2).read_text()
+    Path(pyproject_toml_v2).write_text(
+        content.replace(
+            "dependencies = []",
+            'dependencies = [\n    "Flask (>=1.0)",\n    "requests (>=2.0,<3.0)",\n    "mylib",\n'
+            '    "attrs (>=23.1)",\n]',
+        )
+        + '\n[tool.poetry.dependencies]\nmylib = {path = "../mylib"}\n'
+    )
+    command.option = lambda x: "v2" if x == "poetry-version" else None  # type: ignore
+    command.line = lambda *args, **kwargs: None  # type: ignore
+    command._sync_groups = {"root"}
+
+    command.update_pyproject_toml(
+        {
+            "root": [
+                {"name": "flask", "version": "2.0"},
+                {"name": "requests", "version": ">=2.0,<3.0"},
+                {"name": "attrs", "version": "23.1"},
+                {"name": "django", "version": "==3.0"},
+            ]
+        }
+    )
+
+    updated = Path(pyproject_toml_v2).read_text()
+    assert (
+        'dependencies = [\n    "Flask (>=2.0)",\n    "requests (>=2.0,<3.0)",\n    "attrs (>=23.1)",\n'
+        '    "django (==3.0)",\n]'
+    ) in updated
+    assert "mylib" not in updated
+    assert command._changed_dependencies == {"root": ["django", "flask"]}
+    assert command._removed_dependencies == {"root": ["mylib"]}
+
+
+@pytest.mark.unittests
+def test_update_pyproject_toml_sync_v2_keeps_markers(
+    command: "ImportReqCommand", pyproject_toml_v2, mocker: "MockerFixture"
+):
+    mocker.patch.dict("os.environ", PYPROJECT_CUSTOM_PATH=str(pyproject_toml_v2))
+    content = Path(pyproject_toml_v2).read_text()
+    Path(pyproject_toml_v2).write_text(
+        content.replace(
+            "dependencies = []",
+            "dependencies = [\n    \"foo[bar] (==1); python_version < '3.12'\",\n"
+            "    \"baz[qux] (>=1.0); sys_platform == 'linux'\",\n]",
+        )
+    )
+    command.option = lambda x: "v2" if x == "poetry-version" else None  # type: ignore
+    command.line = lambda *args, **kwargs: None  # type: ignore
+    command._sync_groups = {"root"}
+
+    command.update_pyproject_toml(
+        {
+            "root": [
+                {"name": "foo", "version": "==1", "extras": ["bar"], "markers": 'python_version < "3.12"'},
+                {"name": "baz", "version": "==2.0", "extras": ["qux"], "markers": 'sys_platform == "linux"'},
+            ]
+        }
+    )
+
+    assert list(parse(Path(pyproject_toml_v2).read_text())["project"]["dependencies"]) == [
+        "foo[bar] (==1); python_version < '3.12'",
+        'baz[qux] (==2.0); sys_platform == "linux"',
+    ]
+    assert command._changed_dependencies == {"root": ["baz"]}
+
+
+@pytest.mark.unittests
+def test_sync_updates_only_changed_packages(command: "ImportReqCommand", mocker: "MockerFixture"):
+    command.option = lambda x: x == "lock"  # type: ignore
+    command.line = lambda *args, **kwargs: None  # type: ignore
+    command._sync_groups = {"root"}
+    command._changed_dependencies = {"root": ["flask", "django"]}
+    command._removed_dependencies = {"root": ["attrs"]}
+
+    with patch.object(command, "call") as mock_run:
+        command.lock_or_install_dependencies()
+        mock_run.assert_called_once_with("update", "--lock flask django")
+
+    # only removals: a lock drops them, the other packages keep their versions
+    command._changed_dependencies = {}
+    package_version = mocker.patch("poetry_import.command.package_version", return_value="2.1.0")
+    with patch.object(command, "call") as mock_run:
+        command.lock_or_install_dependencies()
+        mock_run.assert_called_once_with("lock")
+
+    # which Poetry 1 only does when told not to update
+    package_version.return_value = "1.8.3"
+    with patch.object(command, "call") as mock_run:
+        command.lock_or_install_dependencies()
+        mock_run.assert_called_once_with("lock", "--no-update")
+
+
+def _monorepo(root: Path) -> "dict[str, Path]":
+    (root / "base.txt").write_text("requests==2.31.0\n")
+    projects = {}
+    for name, requirements in (("a", "flask==1.0\n"), ("b", "django==3.0\n"), ("c", None)):
+        project = root / "libs" / name
+        project.mkdir(parents=True)
+        (project / "pyproject.toml").write_text(f'[project]\nname = "{name}"\nversion = "0.1.0"\n')
+        if requirements is not None:
+            (project / "requirements.txt").write_text(f"-r ../../base.txt\n{requirements}")
+        projects[name] = project
+    venv = root / ".venv" / "lib"
+    venv.mkdir(parents=True)
+    (venv / "pyproject.toml").write_text("")
+    return projects
+
+
+@pytest.mark.unittests
+def test_command_imports_into_several_projects(tmp_path: Path, monkeypatch: "MonkeyPatch", mocker: "MockerFixture"):
+    projects = _monorepo(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    installer = mocker.patch("poetry_import.command.poetry_installer")
+    installer.return_value.run.return_value = 0
+    read = mocker.spy(ImportReqCommand, "_read_requirements_file")
+
+    command = ImportReqCommand()
+    Application().add(command)
+    tester = CommandTester(command)
+    status = tester.execute("requirements.txt --lock --jobs 2 --batch libs/a --batch libs/b --batch libs/c")
+
+    assert status == 1
+    assert '"flask (==1.0)"' in (projects["a"] / "pyproject.toml").read_text()
+    assert '"requests (==2.31.0)"' in (projects["b"] / "pyproject.toml").read_text()
+    # the base requirements shared by both projects are parsed once
+    assert sorted(str(call.args[1].relative_to(tmp_path)) for call in read.call_args_list) == [
+        "base.txt",
+        str(Path("libs/a/requirements.txt")),
+        str(Path("libs/b/requirements.txt")),
+    ]
+    # each project is locked in process, Poetry's own commands would lock the working directory
+    assert [call.args[1] for call in installer.call_args_list] == [projects["a"], projects["b"]]
+    installer.return_value.lock.assert_called_with(update=False)
+
+    output = tester.io.fetch_output()
+    assert "Imported into 2 of 3 projects, 1 failed:" in output
+    assert f"  {Path('libs/a')}: ok\n  {Path('libs/b')}: ok\n  {Path('libs/c')}: failed: unable to locate" in output
+
+    # discovery finds the projects with the files given, and skips virtual environments
+    status = tester.execute("requirements.txt --discover --dry-run")
+    assert status == 0
+    assert f"  {Path('libs/a')}: ok\n  {Path('libs/b')}: ok\n" in tester.io.fetch_error()
+
+
+@pytest.mark.unittests
+def test_command_syncs_several_projects_like_update_lock(
+    tmp_path: Path, monkeypatch: "MonkeyPatch", mocker: "MockerFixture"
+):
+    projects = _monorepo(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    installer = mocker.patch("poetry_import.command.poetry_installer")
+    installer.return_value.run.return_value = 0
+
+    command = ImportReqCommand()
+    Application().add(command)
+    status = CommandTester(command).execute("requirements.txt --sync --lock --batch libs/a --batch libs/b")
+
+    assert status == 0
+    # only the changed packages are updated, as `poetry update --lock` does
+    assert [call.args[1] for call in installer.call_args_list] == [projects["a"], projects["b"]]
+    installer.return_value.lock.assert_not_called()
+    assert installer.return_value.execute_operations.call_args_list == [call(False), call(False)]
+    assert installer.return_value.update.call_args_list == [call(True), call(True)]
+    assert installer.return_value.whitelist.call_args_list == [
+        call(["flask", "requests"]),
+        call(["django", "requests"]),
+    ]
+
+
+@pytest.mark.unittests
+def test_command_finds_local_projects_in_each_project(
+    tmp_path: Path, monkeypatch: "MonkeyPatch", mocker: "MockerFixture"
+):
+    projects = _monorepo(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("POETRY_IMPORT_CACHE_DIR", str(tmp_path / "cache"))
+    # shared by both projects, so parsed once, but relative to the project importing it
+    (tmp_path / "local.txt").write_text("-e ./tools\nshared @ ./shared\n")
+    for name in ("a", "b"):
+        _local_project(projects[name] / "tools", f"tools-{name}")
+        (projects[name] / "shared").mkdir()
+        (projects[name] / "requirements.txt").write_text("-r ../../local.txt\n")
+    chdir = mocker.spy(os, "chdir")
+
+    command = ImportReqCommand()
+    Application().add(command)
+    status = CommandTester(command).execute("requirements.txt --force --batch libs/a --batch libs/b")
+
+    assert status == 0
+    chdir.assert_not_called()
+    for name in ("a", "b"):
+        pyproject = parse((projects[name] / "pyproject.toml").read_text())
+        assert list(pyproject["project"]["dependencies"]) == [f"tools-{name}", "shared"]
+        assert pyproject["tool"]["poetry"]["dependencies"] == {
+            f"tools-{name}": {"path": "./tools", "develop": True},
+            "shared": {"path": "./shared"},
+        }
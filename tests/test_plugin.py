@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+# standard library
+import subprocess
+import sys
+from typing import TYPE_CHECKING
+from unittest.mock import MagicMock
+
+# pypi library
+import pytest
+
+# poetry-import library
+from poetry_import import ImportReqPlugin, load_import_command
+from poetry_import.command import ImportReqCommand
+
+if TYPE_CHECKING:
+    # pypi library
+    from pytest_mock import MockerFixture
+
+# Budget for importing the plugin and activating it, as reported by `python -X importtime`.
+PLUGIN_ACTIVATION_BUDGET_US = 25_000
+
+ACTIVATION_SCRIPT = """
+import sys
+from unittest.mock import MagicMock
+
+import poetry.plugins.application_plugin
+
+import poetry_import
+
+poetry_import.ImportReqPlugin().activate(MagicMock())
+
+lazy_modules = [m for m in ("poetry_import.command", "poetry_import.backport") if m in sys.modules]
+assert not lazy_modules, f"imported during activation: {lazy_modules}"
+"""
+
+
+def _import_times(script: str) -> "dict[str, int]":
+    """Run `script` under `-X importtime` and return the cumulative import time (us) per module."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    assert proc.returncode == 0, proc.stderr
+
+    times: "dict[str, int]" = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.unittests
+def test_activate_registers_lazy_factory():
+    application = MagicMock()
+
+    ImportReqPlugin().activate(application)
+
+    application.command_loader.register_factory.assert_called_once_with("import", load_import_command)
+
+
+@pytest.mark.unittests
+def test_load_import_command():
+    command = load_import_command()
+
+    assert isinstance(command, ImportReqCommand)
+    assert command.name == "import"
+    assert ImportReqPlugin().commands == [ImportReqCommand]
+
+
+@pytest.mark.unittests
+def test_command_takes_poetry_global_no_cache(mocker: "MockerFixture"):
+    # pypi library
+    from cleo.testers.application_tester import ApplicationTester
+    from poetry.console.application import Application
+
+    application = Application()
+    application.auto_exits(False)
+    ImportReqPlugin().activate(application)
+    handle = mocker.patch.object(ImportReqCommand, "handle", autospec=True, return_value=0)
+
+    assert ApplicationTester(application).execute("--no-cache import requirements.txt") == 0
+    (command,), _ = handle.call_args
+    assert command._no_cache()
+
+
+@pytest.mark.benchmarks
+def test_plugin_activation_import_budget():
+    times = _import_times(ACTIVATION_SCRIPT)
+
+    assert "poetry_import" in times
+    assert (
+        times["poetry_import"] < PLUGIN_ACTIVATION_BUDGET_US
+    ), f"importing the plugin took {times['poetry_import']}us, budget is {PLUGIN_ACTIVATION_BUDGET_US}us"
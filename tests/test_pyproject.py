@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+# standard library
+import os
+import stat
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+# pypi library
+import pytest
+from tomlkit import array, document, dumps, parse
+
+# poetry-import library
+from poetry_import.backport import PoetryVersion
+from poetry_import.pyproject import (
+    ROOT_GROUP,
+    DependencyIndex,
+    end_table,
+    extend_array,
+    group_dependencies_table,
+    parse_pep508,
+    write_if_changed,
+)
+
+if TYPE_CHECKING:
+    # pypi library
+    from pytest_mock import MockerFixture
+
+PYPROJECT = """\
+[project]
+name = "demo"
+dependencies = ["Flask[async] (>=2.0); python_version >= '3.8'", "requests"]
+
+[project.optional-dependencies]
+docs = ["Sphinx==7.0"]
+
+[tool.poetry.dependencies]
+python = "^3.8"
+zope_interface = {version = "6.0", extras = ["test"]}
+
+[tool.poetry.dev-dependencies]
+pytest = "*"
+
+[tool.poetry.group.lint.dependencies]
+Ruff = "0.4.4"
+"""
+
+
+@pytest.mark.unittests
+def test_dependency_index_from_document():
+    index = DependencyIndex.from_document(parse(PYPROJECT), PoetryVersion.V1)
+
+    assert sorted(index) == ["flask", "pytest", "requests", "ruff", "sphinx", "zope-interface"]
+    assert "python" not in index
+    assert index.groups("flask") == {ROOT_GROUP: ">=2.0"}
+    assert index.groups("requests") == {ROOT_GROUP: ""}
+    assert index.groups("sphinx") == {"extra:docs": "7.0"}
+    assert index.groups("Zope.Interface") == {ROOT_GROUP: "6.0"}
+    assert index.groups("pytest") == {"dev": ""}
+    assert index.contains("lint", "ruff")
+    assert not index.contains(ROOT_GROUP, "ruff")
+
+
+@pytest.mark.unittests
+def test_dependency_index_from_v2_document():
+    index = DependencyIndex.from_document(parse(PYPROJECT))
+
+    assert sorted(index) == ["flask", "pytest", "requests", "ruff", "sphinx"]
+    assert index.groups("flask") == {ROOT_GROUP: ">=2.0"}
+    assert not index.contains(ROOT_GROUP, "zope-interface")
+
+    dynamic = DependencyIndex.from_document(parse(PYPROJECT.replace("dependencies = [", "classifiers = [")))
+    assert dynamic.groups("Zope.Interface") == {ROOT_GROUP: "6.0"}
+
+
+@pytest.mark.unittests
+def test_dependency_index_conflicts():
+    index = DependencyIndex()
+    index.add(ROOT_GROUP, "Django", ">=3.0")
+    index.add("test", "django", "==3.0")
+
+    assert index.conflicts("dev", "DJANGO", "3.0") == {ROOT_GROUP: ">=3.0"}
+    assert index.conflicts("dev", "django", "(>= 3.0)") == {"test": "3.0"}
+    assert index.conflicts(ROOT_GROUP, "django", ">=3.0") == {"test": "3.0"}
+    assert index.conflicts("dev", "django", None) == {}
+    assert index.conflicts("dev", "flask", "1.0") == {}
+
+
+@pytest.mark.unittests
+def test_dependency_index_diff():
+    before = DependencyIndex()
+    before.add(ROOT_GROUP, "Django", ">=3.0")
+    before.add("dev", "pytest", "8.0")
+    before.add("dev", "ruff")
+    after = before.copy()
+    after.add("dev", "Flask", "1.0")
+    after.add(ROOT_GROUP, "django", ">=4.0")
+    after.remove("dev", "ruff")
+
+    assert before.diff(after) == {
+        "added": {"dev": {"flask": "1.0"}},
+        "changed": {ROOT_GROUP: {"django": {"from": ">=3.0", "to": ">=4.0"}}},
+        "removed": {"dev": {"ruff": ""}},
+    }
+    assert after.diff(after.copy()) == {}
+    assert before.groups("flask") == {}
+
+
+@pytest.mark.unittests
+def test_dependency_index_differs_and_remove():
+    index = DependencyIndex()
+    index.add(ROOT_GROUP, "Django", "==3.0")
+    index.add("dev", "django")
+
+    assert not index.differs(ROOT_GROUP, "django", "(== 3.0)")
+    assert index.differs(ROOT_GROUP, "django", ">=3.0")
+    assert index.differs("dev", "django", "3.0")
+    assert not index.differs("dev", "django", None)
+    assert not index.differs("lint", "django", "3.0")
+
+    index.remove(ROOT_GROUP, "DJANGO")
+    assert index.groups("django") == {"dev": ""}
+    index.remove("dev", "django")
+    index.remove("dev", "flask")
+    assert "django" not in index and len(index) == 0
+
+
+@pytest.mark.unittests
+@pytest.mark.parametrize(
+    "dependency, expected",
+    [
+        ("Flask[async] (>=2.0); python_version >= '3.8'", ("Flask", ">=2.0")),
+        ("requests>=2.0,<3", ("requests", ">=2.0,<3")),
+        ("mylib", ("mylib", "")),
+        ("# not a requirement", None),
+    ],
+)
+def test_parse_pep508(dependency: str, expected):
+    assert parse_pep508(dependency) == expected
+
+
+@pytest.mark.unittests
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("[]", '["a", "b"]'),
+        ('["x"]', '["x", "a", "b"]'),
+        ('[\n  "x",\n  "y",\n]', '[\n  "x",\n  "y",\n  "a",\n  "b",\n]'),
+        ('[\n    "x",\n    "y"\n]', '[\n    "x",\n    "y",\n    "a",\n    "b"\n]'),
+        ('[\n    "x",  # pinned\n]', '[\n    "x",  # pinned\n    "a",\n    "b",\n]'),
+        ("[\n]", '[\n    "a",\n    "b",\n]'),
+    ],
+)
+def test_extend_array_keeps_layout(source: str, expected: str):
+    data = parse(f"dependencies = {source}\n")
+    extend_array(data["dependencies"], ["a", "b"])
+
+    assert dumps(data) == f"dependencies = {expected}\n"
+    assert parse(dumps(data))["dependencies"][-2:] == ["a", "b"]
+
+
+@pytest.mark.unittests
+def test_extend_array_multiline():
+    data = document()
+    data["dependencies"] = array().multiline(True)
+    extend_array(data["dependencies"], ["a", "b"])
+    extend_array(data["dependencies"], [])
+
+    assert dumps(data) == 'dependencies = [\n    "a",\n    "b",\n]\n'
+
+
+@pytest.mark.unittests
+def test_group_dependencies_table():
+    data = parse(
+        '[tool.poetry]\nname = "demo"\n\n[tool.poetry.group.docs]\noptional = true\n\n'
+        '[build-system]\nrequires = ["poetry-core"]\n'
+    )
+
+    for group, names in [("docs", ["sphinx"]), ("dev", ["pytest", "ruff"])]:
+        dependencies = group_dependencies_table(data, group)
+        for name in names:
+            dependencies[name] = "*"
+        end_table(data, dependencies)
+    assert group_dependencies_table(data, "dev") is dependencies
+
+    assert dumps(data) == (
+        '[tool.poetry]\nname = "demo"\n\n[tool.poetry.group.docs]\noptional = true\n\n'
+        '[tool.poetry.group.docs.dependencies]\nsphinx = "*"\n\n'
+        '[tool.poetry.group.dev.dependencies]\npytest = "*"\nruff = "*"\n\n'
+        '[build-system]\nrequires = ["poetry-core"]\n'
+    )
+    assert parse(dumps(data))["tool"]["poetry"]["group"]["dev"]["dependencies"] == {"pytest": "*", "ruff": "*"}
+
+
+@pytest.mark.unittests
+def test_write_if_changed(tmp_path: Path):
+    path = tmp_path / "pyproject.toml"
+    path.write_text("[project]\n")
+    path.chmod(0o640)
+    os.utime(path, (0, 0))
+    link = tmp_path / "link.toml"
+    link.symlink_to(path)
+
+    assert not write_if_changed(link, "[project]\n", path.read_bytes())
+    assert path.stat().st_mtime == 0
+
+    assert write_if_changed(link, '[project]\nname = "démo"\n', path.read_bytes())
+    assert path.read_text(encoding="utf-8") == '[project]\nname = "démo"\n'
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+    assert link.is_symlink()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["link.toml", "pyproject.toml"]
+
+
+@pytest.mark.unittests
+def test_write_if_changed_keeps_original_on_failure(tmp_path: Path, mocker: "MockerFixture"):
+    path = tmp_path / "pyproject.toml"
+    path.write_text("[project]\n")
+    mocker.patch("poetry_import.pyproject.os.replace", side_effect=OSError("disk full"))
+
+    with pytest.raises(OSError, match="disk full"):
+        write_if_changed(path, '[project]\nname = "demo"\n', path.read_bytes())
+
+    assert path.read_text() == "[project]\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["pyproject.toml"]
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+# standard library
+import time
+from pathlib import Path
+
+# pypi library
+import pytest
+
+# poetry-import library
+from poetry_import.backport import CleoException
+from poetry_import.requirements import (
+    ConstraintsIndex,
+    Include,
+    LineKind,
+    LocalRequirement,
+    RequirementLine,
+    RequirementsGraph,
+    is_local_requirement,
+    join_lines,
+    tokenize_requirements,
+)
+
+PIP_COMPILE_OUTPUT = """\
+#
+# This file is autogenerated by pip-compile with Python 3.12
+#
+--index-url https://pypi.org/simple
+
+certifi==2024.2.2 \\
+    --hash=sha256:0569859f95fc761b18b45ef421b1290a0f65f147e92a1e5eb3e635f9a5e4e66f \\
+    --hash=sha256:dc383c07b76109f368f6106eee2b593b04a011ea4d55f652c6ca24a754d1cdd1
+    # via requests
+requests[socks]==2.31.0 ; python_version >= "3.8" \\
+    --hash=sha256:58cd2187c01e70e6e26505bca751777aa9f2ee0b7f4300988b709f44e013003f
+    # via -r requirements.in
+pkg==1.0 --config-settings editable_mode=compat  # inline comment
+-r base.txt
+-c constraints.txt
+-e ./libs/core
+"""
+
+
+@pytest.mark.unittests
+def test_join_lines():
+    lines = ["a==1 \\\n", "  --hash=sha256:x  \\\n", "  # via b\n", "\n", "# comment\n", "c==2 # trailing\n", "d \\"]
+
+    assert list(join_lines(lines)) == [(1, "a==1   --hash=sha256:x"), (6, "c==2"), (7, "d")]
+
+
+@pytest.mark.unittests
+def test_tokenize_pip_compile_output():
+    assert list(tokenize_requirements(PIP_COMPILE_OUTPUT.splitlines(True))) == [
+        RequirementLine(LineKind.OPTION, "--index-url https://pypi.org/simple", 4),
+        RequirementLine(
+            LineKind.REQUIREMENT,
+            "certifi==2024.2.2",
+            6,
+            (
+                "sha256:0569859f95fc761b18b45ef421b1290a0f65f147e92a1e5eb3e635f9a5e4e66f",
+                "sha256:dc383c07b76109f368f6106eee2b593b04a011ea4d55f652c6ca24a754d1cdd1",
+            ),
+        ),
+        RequirementLine(
+            LineKind.REQUIREMENT,
+            'requests[socks]==2.31.0 ; python_version >= "3.8"',
+            10,
+            ("sha256:58cd2187c01e70e6e26505bca751777aa9f2ee0b7f4300988b709f44e013003f",),
+        ),
+        RequirementLine(LineKind.REQUIREMENT, "pkg==1.0", 13, (), (("config-settings", "editable_mode=compat"),)),
+        RequirementLine(LineKind.REQUIREMENTS_FILE, "base.txt", 14),
+        RequirementLine(LineKind.CONSTRAINTS_FILE, "constraints.txt", 15),
+        RequirementLine(LineKind.EDITABLE, "./libs/core", 16),
+    ]
+
+
+@pytest.mark.unittests
+def test_local_requirement_from_line():
+    def local(kind: LineKind, value: str) -> LocalRequirement:
+        assert is_local_requirement(value)
+        return LocalRequirement.from_line(RequirementLine(kind, value, 1))
+
+    assert local(LineKind.EDITABLE, "./libs/core[dev]") == LocalRequirement("./libs/core", True, ("dev",))
+    assert local(LineKind.REQUIREMENT, "vendor/util") == LocalRequirement("vendor/util")
+    assert local(LineKind.REQUIREMENT, "core[dev, test] @ ../core") == LocalRequirement(
+        "../core", False, ("dev", "test"), "core"
+    )
+    assert not is_local_requirement("core @ https://example.com/core-1.0.tar.gz")
+    assert not is_local_requirement("requests>=2.0")
+
+
+@pytest.mark.benchmarks
+def test_tokenize_hashed_requirements_throughput():
+    hashes = "".join(f"    --hash=sha256:{i:064x} \\\n" for i in range(8))
+    lines = "".join(
+        f"package-{i}=={i}.0.0 \\\n{hashes}    --hash=sha256:{i:064x}\n    # via app\n" for i in range(2000)
+    )
+    physical_lines = lines.splitlines(True)
+    assert len(physical_lines) >= 20_000
+
+    start = time.perf_counter()
+    requirements = list(tokenize_requirements(physical_lines))
+    elapsed = time.perf_counter() - start
+
+    assert len(requirements) == 2000
+    assert all(len(requirement.hashes) == 9 for requirement in requirements)
+    assert elapsed < 1.0, f"tokenized {len(physical_lines)} lines in {elapsed:.3f}s"
+
+
+@pytest.mark.unittests
+def test_requirements_graph_loads_each_file_once(tmp_path: Path):
+    (tmp_path / "base.txt").write_text("base\n")
+    (tmp_path / "a.txt").write_text("-r base.txt\na\n")
+    (tmp_path / "b.txt").write_text("-r a.txt\n-r ./base.txt\n-c constraints.txt\nb\n")
+    loaded: "list[Path]" = []
+
+    def load(path: Path):
+        loaded.append(path)
+        for line in tokenize_requirements(path.read_text().splitlines()):
+            yield line.value if line.kind is LineKind.REQUIREMENT else Include.from_line(line, path)
+
+    graph = RequirementsGraph(load)
+
+    assert list(graph.walk(tmp_path / "a.txt")) == ["base", "a"]
+    assert list(graph.walk(tmp_path / "b.txt")) == [
+        "base",
+        "a",
+        Include(LineKind.CONSTRAINTS_FILE, (tmp_path / "constraints.txt").resolve()),
+        "b",
+    ]
+    assert sorted(loaded) == sorted(p.resolve() for p in tmp_path.glob("*.txt"))
+    assert graph.reachable([tmp_path / "b.txt", tmp_path / "a.txt"]) == [
+        (tmp_path / name).resolve() for name in ("b.txt", "constraints.txt", "a.txt", "base.txt")
+    ]
+
+
+@pytest.mark.unittests
+def test_requirements_graph_detects_cycles(tmp_path: Path):
+    (tmp_path / "a.txt").write_text("-r b.txt\n")
+    (tmp_path / "b.txt").write_text("-r a.txt\n")
+
+    def load(path: Path):
+        for line in tokenize_requirements(path.read_text().splitlines()):
+            yield Include.from_line(line, path)
+
+    with pytest.raises(CleoException, match="cycle"):
+        list(RequirementsGraph(load).walk(tmp_path / "a.txt"))
+
+
+@pytest.mark.unittests
+def test_constraints_index_layers_canonical_names():
+    index = ConstraintsIndex(
+        {"Django": "3.0", "pydantic_settings": "2.0"},
+        {"django": "3.2"},
+        {"Zope.Interface": "5.0"},
+    )
+
+    assert index["DJANGO"] == "3.2"
+    assert index.get("Pydantic-Settings") == "2.0"
+    assert index.get("zope-interface") == "5.0"
+    assert index.get("flask") is None
+    assert index == {"django": "3.2", "pydantic-settings": "2.0", "zope-interface": "5.0"}
+    assert ConstraintsIndex({"flask": "1.0"}, index) == {**index, "flask": "1.0"}